@@ -1,7 +1,6 @@
 from PIL import Image, ImageDraw, ImageFont
 import openai
-import requests
-from io import BytesIO
+import http_client
 import re
 import argparse
 import pathlib
@@ -18,6 +17,8 @@ from credentials import credentials
 
 openai.api_key = credentials()
 
+MAX_IMAGE_BYTES = 16 * 1024 * 1024  # largest download accepted from the image URL
+
 def generate_random_prompt():
     completion = openai.ChatCompletion.create(
         model="gpt-3.5-turbo",
@@ -29,56 +30,96 @@ def generate_random_prompt():
     )
     return completion.choices[0].message['content']
 
+def generate_random_prompts(count):
+    if count <= 1:
+        return [generate_random_prompt()]
+    
+    # Ask for all prompts in one request, one per line
+    completion = openai.ChatCompletion.create(
+        model="gpt-3.5-turbo",
+        messages=[
+            {"role": "system", 
+             "content": f"Create {count} different concise image prompts (max 5 words each), specifying art "
+                        "style, subject, and details. Reply with one prompt per line and nothing else."
+            },
+        ]
+    )
+    lines = completion.choices[0].message['content'].splitlines()
+    prompts = [re.sub(r'^\s*(\d+[.)]|[-*•])\s*', '', line).strip().strip('"') for line in lines]
+    return [prompt for prompt in prompts if prompt][:count] or [generate_random_prompt()]
+
 def sanitize_filename(filename):
     # Remove or replace any character that's not allowed in filenames
     return re.sub(r'[<>:"/\\|?*]', '_', filename)  # Replaces invalid characters with underscores
 
-def generate_image():
+def generate_images():
+    parser = argparse.ArgumentParser()
+    
+    parser.add_argument("--batch-prompts", type=int, default=1, help="Prompts generated in one chat request")
+    parser.add_argument("--images-per-prompt", "-n", type=int, default=1, help="Images generated per prompt (max 10)")
+    
+    args, _ = parser.parse_known_args()
+    
+    # Ensure the 'pictures' directory exists next to this script
+    pictures_dir = pathlib.Path(__file__).parent / "pictures"
+    pictures_dir.mkdir(parents=True, exist_ok=True)
+    
+    image_paths = []
     try:
-        # Generate a random prompt using GPT-3.5
-        prompt = generate_random_prompt()
-        print("Generated prompt:", prompt)
-
-        # Generate an image from the random prompt
-        response = openai.Image.create(
-            prompt= prompt,
-            n=1,
-            size="1024x1024"
-        )
-        
-        # Get the image URL
-        image_url = response['data'][0]['url']
-        print("Image URL:", image_url)
-        
-        # Download the image
-        image_response = requests.get(image_url)
-        image = Image.open(BytesIO(image_response.content))
-        
-        # Ensure the 'pictures' directory exists next to this script
-        pictures_dir = pathlib.Path(__file__).parent / "pictures"
-        pictures_dir.mkdir(parents=True, exist_ok=True)
-
-        # Save the image 
-        sanitized_filename = sanitize_filename(prompt) + ".png"
-        final_image_path = pictures_dir / sanitized_filename
-        image.save(final_image_path)
-        
-        return final_image_path
-
+        # Generate the random prompts using GPT-3.5
+        prompts = generate_random_prompts(args.batch_prompts)
     except Exception as e:
-        print("Error generating image:", e)
-        return None
+        print("Error generating prompts:", e)
+        return image_paths
+    
+    for prompt in prompts:
+        try:
+            print("Generated prompt:", prompt)
+
+            # Generate all images for this prompt in one request
+            response = openai.Image.create(
+                prompt= prompt,
+                n=max(1, min(args.images_per_prompt, 10)),
+                size="1024x1024"
+            )
+            
+            for number, item in enumerate(response['data'], start=1):
+                # Get the image URL
+                image_url = item['url']
+                print("Image URL:", image_url)
+                
+                # Stream the image straight to disk
+                suffix = f"_{number}" if number > 1 else ""
+                final_image_path = pictures_dir / (sanitize_filename(prompt) + suffix + ".png")
+                http_client.download_to_file(image_url, str(final_image_path), MAX_IMAGE_BYTES)
+                image_paths.append(final_image_path)
+
+        except Exception as e:
+            print("Error generating image:", e)
+    
+    return image_paths
 
 def clear_image():
+    parser = argparse.ArgumentParser()
+    
+    parser.add_argument("--clear-passes", type=int, default=2, help="Number of refreshes used to clear the panel")
+    parser.add_argument("--clear-colour", default="white", help="Colour to clear to (white, clean, black, ...)")
+    
     inky = auto(ask_user=True, verbose=True)
+    args, _ = parser.parse_known_args()
+    
+    if args.clear_colour.lower() == "clean":
+        colour = CLEAN
+    else:
+        colour = getattr(inky, args.clear_colour.upper(), inky.WHITE)
     
-    for _ in range(2):
-        for y in range(inky.height):
-            for x in range(inky.width):
-                inky.set_pixel(x, y, inky.WHITE)
+    for i in range(max(1, args.clear_passes)):
+        # Fill the whole buffer at once instead of one set_pixel call per pixel
+        inky.buf.fill(colour)
     
         inky.show()
-        time.sleep(1.0)
+        if i < args.clear_passes - 1:
+            time.sleep(1.0)
 
 def display_image(image_path):
     parser = argparse.ArgumentParser()
@@ -99,12 +140,13 @@ def display_image(image_path):
     
     inky.show()
 
-# Generate the image and get its path
-image_path = generate_image()
+# Generate the images and get their paths
+image_paths = generate_images()
 
-# Clear monitor, then display the generated image if successful
-if image_path:
+# Clear monitor, then display the first generated image if successful
+if image_paths:
+    print(f"Generated {len(image_paths)} images")
     clear_image()
-    display_image(image_path)
+    display_image(image_paths[0])
 else:
     print("Failed to generate an image.")
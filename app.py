@@ -1,20 +1,39 @@
-from flask import Flask, request, render_template, jsonify, send_from_directory
+from flask import Flask, Request, Response, request, render_template, jsonify, send_from_directory, send_file, stream_with_context
 from werkzeug.utils import secure_filename
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageFont, features
 import openai
-import requests
-from io import BytesIO
+import http_client
+import imaging
+import quantize
+import simulated_display
 import os
 import pathlib
 import argparse
 import time
 import threading
+import queue
 import re
+import itertools
 import json
+import hashlib
 import sqlite3
+import tempfile
+import atexit
+import random
+import shutil
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from collections import OrderedDict, deque
 from datetime import datetime
-from inky.auto import auto
-from inky.inky_uc8159 import CLEAN
+try:
+    from inky.auto import auto
+    from inky.inky_uc8159 import CLEAN
+except ImportError:
+    # Without the inky library only the simulated display (INKY_SIMULATE) works
+    auto = None
+    CLEAN = simulated_display.CLEAN
 
 # Import your credentials if available
 try:
@@ -24,15 +43,64 @@ except ImportError:
     # If credentials.py doesn't exist, expect API key as environment variable
     openai.api_key = os.getenv('OPENAI_API_KEY')
 
+# Point the OpenAI client at another server, e.g. a local stand-in for testing
+if os.getenv('OPENAI_API_BASE'):
+    openai.api_base = os.getenv('OPENAI_API_BASE')
+
+# Run without a panel: INKY_SIMULATE=<model> (see simulated_display.PANELS) replaces hardware detection
+SIMULATED_PANEL = os.getenv('INKY_SIMULATE')
+SIMULATED_REFRESH_TIME = os.getenv('INKY_SIMULATE_REFRESH_TIME')  # seconds per show(), default the model's
+SIMULATED_FRAMES_FOLDER = os.getenv('INKY_SIMULATE_FRAMES')  # save every simulated refresh here as a PNG
+
+class UploadRequest(Request):
+    """Request that writes uploaded files straight into the uploads folder, hashing them as they arrive"""
+    @property
+    def max_content_length(self):
+        # Batches and archives for /import are bigger than one image; each image is still
+        # size-checked on ingest. A property works on every Flask version, unlike assigning it.
+        if self.endpoint == 'import_upload':
+            return IMPORT_MAX_CONTENT_LENGTH
+        return super().max_content_length
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # /import hashes each image in the pool anyway, so its files are only spooled
+        return imaging.SpooledUpload(UPLOAD_FOLDER, hashed=self.endpoint != 'import_upload')
+
 app = Flask(__name__)
+app.request_class = UploadRequest
 
 # Configuration
 UPLOAD_FOLDER = 'uploads'
 PICTURES_FOLDER = 'pictures'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
 MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+INGEST_CHUNK_SIZE = 64 * 1024  # bytes written per chunk when saving incoming images
 SETTINGS_FILE = 'settings.json'
+SETTINGS_WRITE_DELAY = 2.0  # seconds of settings changes batched into one file write
+SETTINGS_FSYNC = True  # fsync settings.json before replacing it, at the cost of SD card writes
 DATABASE_FILE = 'images.db'
+DB_POOL_SIZE = 4  # idle SQLite connections kept open for reuse
+FRAME_CACHE_FOLDER = os.path.join('cache', 'frames')
+FRAME_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 64MB of pre-rendered display frames
+DISPLAY_STATE_FILE = os.path.join('cache', 'display_state.json')  # hash of the frame on the panel
+PRERENDER_QUEUE_SIZE = 8
+THUMBNAIL_FOLDER = os.path.join('cache', 'thumbs')
+THUMBNAIL_SIZES = (160, 320, 640)  # longest edge in pixels
+THUMBNAIL_FORMAT = 'WEBP' if features.check('webp') else 'JPEG'
+THUMBNAIL_MAX_AGE = 7 * 24 * 60 * 60  # browser cache lifetime in seconds
+PLAYLIST_HISTORY = 50  # shown images remembered for 'previous'
+MAX_PAGE_SIZE = 200  # most images returned per page of /images
+MAX_AI_BATCH_PROMPTS = 10  # prompts asked for in one chat request
+MAX_AI_IMAGES_PER_PROMPT = 10  # images asked for in one DALL-E request (the API's limit for n)
+AI_RETRY_DELAY = 5  # first wait after a failed AI generation, doubled per failure
+AI_RETRY_MAX_DELAY = 600  # longest wait between AI generation attempts
+IMPORT_MAX_CONTENT_LENGTH = 512 * 1024 * 1024  # largest /import request (many images or a ZIP)
+IMPORT_MAX_FILES = 5000  # most images in one /import request, counting those inside ZIPs
+IMPORT_PROGRESS_EVERY = 25  # images between import progress lines
+IMAGE_WORKERS = max(1, (os.cpu_count() or 1) - 1)  # image pool processes; one core is left for the web server
+MAX_DISPLAY_JOBS = 100  # finished display jobs kept for status lookups
+STATUS_WAIT_TIMEOUT = 30  # longest a long-poll /status request is held, in seconds
+EVENTS_HEARTBEAT = 15  # seconds between keep-alive comments on /events
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
@@ -40,13 +108,97 @@ app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 # Create directories if they don't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(PICTURES_FOLDER, exist_ok=True)
+os.makedirs(FRAME_CACHE_FOLDER, exist_ok=True)
+os.makedirs(THUMBNAIL_FOLDER, exist_ok=True)
 
 # Global variables for cycling control
 cycling_thread = None
 cycling_active = False
 ai_mode_active = False
-current_image_index = 0
-current_album_images = []
+current_playlist = None  # Playlist being cycled, built by the worker on first use
+worker_generation = 0  # bumped on every start/stop; a worker exits once its generation is stale
+
+# Cycle scheduler: the worker sleeps on scheduler_condition until its deadline or a wake-up
+scheduler_condition = threading.Condition()
+scheduler_command = None  # 'next', 'previous' or 'skip', consumed by the worker
+
+# In-memory settings; settings.json is only read at startup and written behind changes
+settings_condition = threading.Condition()  # guards the state below and wakes settings waiters
+settings_store = None
+settings_version = 0
+settings_dirty = False
+settings_write_timer = None
+
+# In-memory state behind /status; status_version increases on every change
+status_condition = threading.Condition()  # guards the state below and wakes status waiters
+status_version = 0
+album_image_counts = {}  # album id (None when unfiled) -> number of images
+album_names = {}  # album id -> name
+
+# Idle database connections, most recently used first
+db_pool = queue.LifoQueue(maxsize=DB_POOL_SIZE)
+
+# Schema changes applied in order on startup; PRAGMA user_version records how many ran
+SCHEMA_MIGRATIONS = [
+    # 1: album listings filter on album_id and sort on created_at
+    [
+        'CREATE INDEX IF NOT EXISTS idx_images_album_created ON images (album_id, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_images_created ON images (created_at)'
+    ],
+    # 2: paginated listings use (created_at, id) as the cursor, so the index carries id too
+    [
+        'DROP INDEX IF EXISTS idx_images_album_created',
+        'DROP INDEX IF EXISTS idx_images_created',
+        'CREATE INDEX IF NOT EXISTS idx_images_album_created_id ON images (album_id, created_at, id)',
+        'CREATE INDEX IF NOT EXISTS idx_images_created_id ON images (created_at, id)'
+    ],
+]
+
+# Columns the image listings can be narrowed to with ?fields=
+IMAGE_FIELDS = {
+    'id': 'i.id',
+    'filename': 'i.filename',
+    'original_filename': 'i.original_filename',
+    'filepath': 'i.filepath',
+    'album_id': 'i.album_id',
+    'album_name': 'a.name as album_name',
+    'file_size': 'i.file_size',
+    'image_type': 'i.image_type',
+    'content_hash': 'i.content_hash',
+    'created_at': 'i.created_at'
+}
+
+# Display frame cache state (LRU order: least recently used first)
+frame_cache_lock = threading.Lock()
+frame_cache_index = OrderedDict()  # filename -> size in bytes
+frame_cache_bytes = 0
+content_hash_memo = {}  # (path, mtime, size) -> sha256 hex digest
+content_locks = [threading.Lock() for _ in range(64)]  # striped by content hash, see content_lock
+
+# Look-ahead pre-render state; jobs from an older generation are dropped
+prerender_thread = None
+prerender_queue = queue.Queue(maxsize=PRERENDER_QUEUE_SIZE)
+prerender_generation = 0
+
+# Prefetched AI images: the pool worker keeps it topped up while AI mode is active
+ai_pool_thread = None
+ai_pool_condition = threading.Condition()
+ai_pool = deque()  # ready images as {'image_id', 'path', 'prompt'}, oldest first
+
+# Image processing pool: decoding, resizing and quantizing run in worker processes
+image_pool = None
+image_pool_lock = threading.Lock()
+
+# Display manager state: the panel is detected once and only the display worker drives it
+display_device = None
+display_device_lock = threading.Lock()
+shown_frame_hash = None  # hash of the buffer last refreshed onto the panel, loaded on first use
+shown_frame_loaded = False
+display_thread = None
+display_jobs_condition = threading.Condition()
+display_jobs = OrderedDict()  # job id -> job, oldest first
+display_job_ids = itertools.count(1)
+pending_display_job = None  # newest job not yet started; older pending jobs are superseded
 
 # Default settings
 default_settings = {
@@ -54,12 +206,21 @@ default_settings = {
     'saturation': 0.5,
     'ai_generation_interval': 300,  # 5 minutes for AI images
     'current_mode': 'manual',  # manual, cycle, ai
-    'current_album': 1  # ID of currently cycling album
+    'current_album': 1,  # ID of currently cycling album
+    'prerender_ahead': 2,  # frames prepared ahead of the cycle
+    'ai_pool_size': 2,  # AI images generated and rendered ahead of time
+    'ai_batch_prompts': 1,  # prompts per chat request when generating AI images
+    'ai_images_per_prompt': 1,  # images per DALL-E request
+    'clear_passes': 2,  # full refreshes per clear
+    'clear_colours': ['white'],  # colour of each clear pass, repeated if fewer than passes
+    'display_master_size': 0,  # longest edge kept for new images, 0 keeps originals
+    'cycle_order': 'newest',  # newest, oldest, shuffle or weighted (newer images more often)
+    'dither_preset': quantize.DEFAULT_DITHER_PRESET  # fast, balanced or quality (see quantize.DITHER_PRESETS)
 }
 
 def init_database():
     """Initialize the SQLite database for albums and images"""
-    conn = sqlite3.connect(DATABASE_FILE)
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     # Create albums table
@@ -87,33 +248,229 @@ def init_database():
         )
     ''')
     
+    # Content hash column for deduplicated storage (added after the first release)
+    columns = [row[1] for row in cursor.execute('PRAGMA table_info(images)')]
+    if 'content_hash' not in columns:
+        cursor.execute('ALTER TABLE images ADD COLUMN content_hash TEXT')
+    # Not unique: duplicate uploads are extra rows referencing the same stored file
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_images_content_hash ON images (content_hash)')
+    
+    # Hash images stored before content addressing
+    legacy = cursor.execute('SELECT id, filepath FROM images WHERE content_hash IS NULL').fetchall()
+    for image_id, filepath in legacy:
+        if os.path.exists(filepath):
+            cursor.execute('UPDATE images SET content_hash = ? WHERE id = ?',
+                           (file_content_hash(filepath), image_id))
+    
     # Create default "All Images" album
     cursor.execute('INSERT OR IGNORE INTO albums (id, name, description) VALUES (1, "All Images", "Default album containing all images")')
-    
     conn.commit()
+    
+    # Apply pending schema migrations
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    for number, statements in enumerate(SCHEMA_MIGRATIONS[version:], start=version + 1):
+        for statement in statements:
+            conn.execute(statement)
+        conn.execute(f'PRAGMA user_version = {number}')
+        conn.commit()
+        print(f"Applied database migration {number}")
+    
     conn.close()
 
-def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DATABASE_FILE)
+class PooledConnection:
+    """SQLite connection borrowed from the pool; close() hands it back instead of closing it"""
+    
+    def __init__(self, conn):
+        self._conn = conn
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+    
+    def __enter__(self):
+        return self._conn.__enter__()
+    
+    def __exit__(self, *exc_info):
+        return self._conn.__exit__(*exc_info)
+    
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            db_pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+def open_db_connection():
+    """Open a new SQLite connection with WAL journaling and tuned pragmas"""
+    # Pooled connections move between request threads, but only one thread uses each at a time
+    conn = sqlite3.connect(DATABASE_FILE, timeout=10, check_same_thread=False, cached_statements=128)
     conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode = WAL')  # Readers no longer block the writer
+    conn.execute('PRAGMA synchronous = NORMAL')  # Safe with WAL, far fewer fsyncs on the SD card
+    conn.execute('PRAGMA cache_size = -8192')  # 8MB page cache
+    conn.execute('PRAGMA mmap_size = 67108864')  # 64MB memory-mapped reads
+    conn.execute('PRAGMA foreign_keys = ON')
     return conn
 
-def load_settings():
+def get_db_connection():
+    """Get database connection from the pool"""
+    try:
+        conn = db_pool.get_nowait()
+    except queue.Empty:
+        conn = open_db_connection()
+    return PooledConnection(conn)
+
+def read_settings_file():
+    """Read settings.json merged with the defaults"""
     try:
         with open(SETTINGS_FILE, 'r') as f:
             settings = json.load(f)
-        # Merge with defaults in case new settings were added
-        for key, value in default_settings.items():
-            if key not in settings:
-                settings[key] = value
-        return settings
     except FileNotFoundError:
         return default_settings.copy()
+    except ValueError as e:
+        print(f"Error reading {SETTINGS_FILE}, using defaults: {e}")
+        return default_settings.copy()
+    
+    # Merge with defaults in case new settings were added
+    for key, value in default_settings.items():
+        if key not in settings:
+            settings[key] = value
+    
+    # An unknown preset, e.g. from a hand-edited file, falls back to the default
+    if settings['dither_preset'] not in quantize.DITHER_PRESETS:
+        settings['dither_preset'] = quantize.DEFAULT_DITHER_PRESET
+    return settings
+
+def write_settings_file(settings):
+    """Write settings.json atomically via a temporary file and rename"""
+    directory = os.path.dirname(os.path.abspath(SETTINGS_FILE))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.settings-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(settings, f, indent=2)
+            if SETTINGS_FSYNC:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, SETTINGS_FILE)
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+def flush_settings():
+    """Write pending settings changes to disk now"""
+    global settings_dirty, settings_write_timer
+    
+    with settings_condition:
+        settings_write_timer = None
+        if not settings_dirty:
+            return
+        snapshot = dict(settings_store)
+        settings_dirty = False
+    
+    try:
+        write_settings_file(snapshot)
+    except Exception as e:
+        print(f"Error saving settings: {e}")
+        with settings_condition:
+            settings_dirty = True
+
+def load_settings():
+    """Get a copy of the current settings, read from disk only the first time"""
+    global settings_store
+    
+    with settings_condition:
+        if settings_store is None:
+            settings_store = read_settings_file()
+        return dict(settings_store)
 
 def save_settings(settings):
-    with open(SETTINGS_FILE, 'w') as f:
-        json.dump(settings, f, indent=2)
+    """Replace the settings; the file is written shortly after, batching rapid changes"""
+    global settings_store, settings_version, settings_dirty, settings_write_timer
+    
+    with settings_condition:
+        settings_store = dict(settings)
+        settings_version += 1
+        settings_dirty = True
+        if settings_write_timer is None:
+            settings_write_timer = threading.Timer(SETTINGS_WRITE_DELAY, flush_settings)
+            settings_write_timer.daemon = True
+            settings_write_timer.start()
+        settings_condition.notify_all()
+    
+    record_status_change()
+    wake_scheduler()
+
+def update_settings(changes):
+    """Apply changes to the settings in one step, so concurrent updates don't overwrite each other"""
+    with settings_condition:
+        settings = load_settings()
+        settings.update(changes)
+        save_settings(settings)
+    return settings
+
+def record_status_change():
+    """Bump the status version after any change visible in /status"""
+    global status_version
+    
+    with status_condition:
+        status_version += 1
+        status_condition.notify_all()
+
+def wait_for_status_change(since, timeout):
+    """Block until the status version is newer than since, or the timeout passes"""
+    with status_condition:
+        return status_condition.wait_for(lambda: status_version > since, timeout)
+
+def load_status_counters():
+    """Load album names and per-album image counts into memory"""
+    conn = get_db_connection()
+    counts = conn.execute('SELECT album_id, COUNT(*) AS image_count FROM images GROUP BY album_id').fetchall()
+    albums = conn.execute('SELECT id, name FROM albums').fetchall()
+    conn.close()
+    
+    with status_condition:
+        album_image_counts.clear()
+        album_image_counts.update({row['album_id']: row['image_count'] for row in counts})
+        album_names.clear()
+        album_names.update({row['id']: row['name'] for row in albums})
+    record_status_change()
+
+def update_album_image_count(album_id, delta):
+    """Adjust the in-memory image count of an album"""
+    with status_condition:
+        album_image_counts[album_id] = album_image_counts.get(album_id, 0) + delta
+    record_status_change()
+
+def get_status_snapshot():
+    """Build the /status payload from in-memory state only"""
+    settings = load_settings()
+    with status_condition:
+        image_count = sum(album_image_counts.values())
+        current_album_name = album_names.get(settings.get('current_album', 1), "All Images")
+        version = status_version
+    
+    with ai_pool_condition:
+        ai_pool_ready = len(ai_pool)
+    
+    return {
+        'version': version,
+        'cycling_active': cycling_active,
+        'ai_mode_active': ai_mode_active,
+        'settings': settings,
+        'image_count': image_count,
+        'current_mode': settings.get('current_mode', 'manual'),
+        'current_album_name': current_album_name,
+        'current_image_index': current_playlist.current_number() if current_playlist else 0,
+        'total_album_images': len(current_playlist) if current_playlist else 0,
+        'cycle_time': settings.get('cycle_time', 30),
+        'ai_generation_interval': settings.get('ai_generation_interval', 300),
+        'saturation': settings.get('saturation', 0.5),
+        'ai_pool_ready': ai_pool_ready
+    }
 
 def allowed_file(filename):
     return '.' in filename and \
@@ -123,109 +480,1146 @@ def sanitize_filename(filename):
     """Remove or replace any character that's not allowed in filenames"""
     return re.sub(r'[<>:"/\\|?*]', '_', filename)
 
-def clear_display():
-    """Clear the Inky display"""
+def content_lock(content_hash):
+    """Lock for storing or removing the file with this content hash
+    
+    Held from the exists-check until the new row is in, and from the reference
+    count until the file is removed, so a delete can't take a file that an
+    upload of the same content is about to point at.
+    """
+    return content_locks[int(content_hash[:8], 16) % len(content_locks)]
+
+def add_image_from_stream(chunks, folder, ext, original_filename, album_id=None, image_type='uploaded',
+                          max_bytes=MAX_CONTENT_LENGTH):
+    """Store an incoming image content-addressed in folder (see imaging.ingest_chunks) and add its row
+    
+    Returns (image_id, filepath); raises ValueError if the stream is too large or
+    is not an image, or sqlite3.Error if the row can't be added.
+    """
+    # Receiving and hashing stays on this thread; decoding happens in the image pool
+    spooled = imaging.spool_chunks(chunks, folder, max_bytes)
+    return add_spooled_image(spooled, folder, ext, original_filename, album_id, image_type)
+
+def add_spooled_image(spooled, folder, ext, original_filename, album_id=None, image_type='uploaded'):
+    """Store an image already spooled into folder and add its row, as add_image_from_stream
+    
+    spooled is (temp_path, size, content_hash), from imaging.spool_chunks or an
+    imaging.SpooledUpload; the temporary file is moved or removed.
+    """
+    temp_path, size, content_hash = spooled
+    filepath = os.path.join(folder, content_hash + ext.lower())
+    
+    with content_lock(content_hash):
+        if os.path.exists(filepath):
+            # Already stored; only a new reference row is added
+            os.remove(temp_path)
+            size = os.path.getsize(filepath)
+        else:
+            master_size = int(load_settings().get('display_master_size') or 0)
+            size = run_image_task(imaging.store_spooled, temp_path, filepath, master_size)
+            
+            # Seed the hash memo so the frame cache doesn't read the file again
+            stat = os.stat(filepath)
+            content_hash_memo[(os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size)] = content_hash
+        
+        try:
+            image_id = add_image_to_db(os.path.basename(filepath), original_filename, filepath, album_id=album_id,
+                                       file_size=size, image_type=image_type, content_hash=content_hash)
+        except sqlite3.Error:
+            # e.g. the album was deleted meanwhile
+            discard_unreferenced_file(filepath)
+            raise
+    
+    return image_id, filepath
+
+def file_content_hash(filepath):
+    """Get the SHA-256 of a file, memoized on path, mtime and size"""
+    stat = os.stat(filepath)
+    memo_key = (os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size)
+    digest = content_hash_memo.get(memo_key)
+    if digest is None:
+        digest = imaging.hash_file(filepath)
+        content_hash_memo[memo_key] = digest
+    return digest
+
+def get_process_pool_context():
+    """Start worker processes from a fresh interpreter where possible, not a fork of this threaded app"""
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context()
+
+def get_image_pool():
+    """Get the image processing pool, starting it on first use"""
+    global image_pool
+    
+    with image_pool_lock:
+        if image_pool is None:
+            image_pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=get_process_pool_context())
+        return image_pool
+
+def reset_image_pool(broken_pool):
+    """Replace a pool whose worker died (e.g. killed for memory) so later tasks can run"""
+    global image_pool
+    
+    with image_pool_lock:
+        if image_pool is broken_pool:
+            image_pool = None
+    broken_pool.shutdown(wait=False)
+
+def run_image_task(function, *args):
+    """Run an imaging function in the image pool and wait for its result
+    
+    The calling thread blocks without holding the GIL, so request handlers stay
+    responsive. A broken pool is replaced and the task retried once.
+    """
+    pool = get_image_pool()
+    try:
+        return pool.submit(function, *args).result()
+    except BrokenProcessPool:
+        print("Image pool broke, restarting it")
+        reset_image_pool(pool)
+        return get_image_pool().submit(function, *args).result()
+
+def run_image_tasks(function, arg_list):
+    """Run an imaging function over many argument tuples, yielding (index, future) as they finish
+    
+    At most IMAGE_WORKERS tasks are queued at once, so interactive work submitted
+    meanwhile only waits behind a handful of bulk tasks.
+    """
+    pool = get_image_pool()
+    pending = {}
+    arg_iter = iter(enumerate(arg_list))
+    
+    while True:
+        for index, args in itertools.islice(arg_iter, IMAGE_WORKERS - len(pending)):
+            pending[pool.submit(function, *args)] = index
+        if not pending:
+            return
+        
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield pending.pop(future), future
+
+def get_display_palette(inky, saturation):
+    """Get the panel palette blended for a saturation, or None if the driver has no palette"""
+    palette_blend = getattr(inky, '_palette_blend', None)
+    if palette_blend is None:
+        return None
+    try:
+        return list(palette_blend(saturation))
+    except Exception as e:
+        print(f"Error reading display palette: {e}")
+        return None
+
+def load_frame_cache_index():
+    """Rebuild the in-memory LRU index from the frames already on disk"""
+    global frame_cache_bytes
+    
+    entries = []
+    for entry in os.scandir(FRAME_CACHE_FOLDER):
+        if entry.is_file() and entry.name.endswith('.png'):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, entry.name, stat.st_size))
+    
+    with frame_cache_lock:
+        frame_cache_index.clear()
+        frame_cache_bytes = 0
+        for _, name, size in sorted(entries):
+            frame_cache_index[name] = size
+            frame_cache_bytes += size
+
+def remove_cached_frame(key):
+    """Drop a frame from the cache index and disk (caller holds frame_cache_lock)"""
+    global frame_cache_bytes
+    
+    frame_cache_bytes -= frame_cache_index.pop(key, 0)
     try:
-        inky = auto(ask_user=False, verbose=False)
-        
-        for _ in range(2):
-            for y in range(inky.height):
-                for x in range(inky.width):
-                    inky.set_pixel(x, y, inky.WHITE)
-            inky.show()
-            time.sleep(1.0)
+        os.remove(os.path.join(FRAME_CACHE_FOLDER, key))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Error removing cached frame {key}: {e}")
+
+def register_cached_frame(key, size):
+    """Add a frame written to the cache folder to the index and evict least recently used frames over the size limit"""
+    global frame_cache_bytes
+    
+    image_prefix, content_hash = key.split('_')[:2]
+    with frame_cache_lock:
+        # A different hash for the same image means the file was replaced
+        for other in [k for k in frame_cache_index
+                      if k.startswith(image_prefix + '_') and k.split('_')[1] != content_hash]:
+            remove_cached_frame(other)
+        
+        frame_cache_bytes -= frame_cache_index.pop(key, 0)
+        frame_cache_index[key] = size
+        frame_cache_bytes += size
+        
+        while frame_cache_bytes > FRAME_CACHE_MAX_BYTES and len(frame_cache_index) > 1:
+            oldest = next(iter(frame_cache_index))
+            remove_cached_frame(oldest)
+
+def invalidate_frame_cache(image_id):
+    """Remove all cached frames for an image"""
+    prefix = f"{image_id}_"
+    with frame_cache_lock:
+        for key in [k for k in frame_cache_index if k.startswith(prefix)]:
+            remove_cached_frame(key)
+
+def get_quantize_method():
+    """Get the quantize method for the configured dither preset"""
+    preset = load_settings().get('dither_preset')
+    return quantize.DITHER_PRESETS.get(preset, quantize.DITHER_PRESETS[quantize.DEFAULT_DITHER_PRESET])
+
+def get_display_frame(image_path, inky, saturation, image_id=None):
+    """Get the display-ready frame for an image, rendering and caching it on a miss"""
+    method = get_quantize_method()
+    key = imaging.frame_cache_key(image_id, file_content_hash(image_path), inky.resolution, saturation, method)
+    path = os.path.join(FRAME_CACHE_FOLDER, key)
+    
+    with frame_cache_lock:
+        hit = key in frame_cache_index
+        if hit:
+            frame_cache_index.move_to_end(key)
+    
+    if hit:
+        try:
+            frame = Image.open(path)
+            frame.load()
+            os.utime(path)  # Keep LRU order across restarts
+            return frame
+        except Exception as e:
+            print(f"Error reading cached frame {key}: {e}")
+            with frame_cache_lock:
+                remove_cached_frame(key)
+    
+    # Rendered in the image pool straight into the cache folder, then loaded from there
+    size = run_image_task(imaging.render_frame_file, image_path, inky.resolution,
+                          get_display_palette(inky, saturation), path, method)
+    register_cached_frame(key, size)
+    
+    frame = Image.open(path)
+    frame.load()
+    return frame
+
+def thumbnail_filename(content_hash, size):
+    """Build the cache filename for a thumbnail"""
+    return imaging.thumbnail_filename(content_hash, size, THUMBNAIL_FORMAT)
+
+def get_thumbnail(image_path, size):
+    """Get the path of a thumbnail for an image, generating it on first use"""
+    path = os.path.join(THUMBNAIL_FOLDER, thumbnail_filename(file_content_hash(image_path), size))
+    if os.path.exists(path):
+        return path
+    
+    return run_image_task(imaging.make_thumbnail, image_path, path, size, THUMBNAIL_FORMAT)
+
+def delete_thumbnails(content_hash):
+    """Remove every thumbnail size for an image"""
+    for size in THUMBNAIL_SIZES:
+        try:
+            os.remove(os.path.join(THUMBNAIL_FOLDER, thumbnail_filename(content_hash, size)))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error deleting thumbnail: {e}")
+
+def get_display():
+    """Get the Inky display, detecting it on first use"""
+    global display_device
+    
+    with display_device_lock:
+        if display_device is None and SIMULATED_PANEL:
+            refresh_time = float(SIMULATED_REFRESH_TIME) if SIMULATED_REFRESH_TIME else None
+            display_device = simulated_display.SimulatedInky(SIMULATED_PANEL, refresh_time, SIMULATED_FRAMES_FOLDER)
+            print(f"Simulating {SIMULATED_PANEL} display with resolution {display_device.resolution}")
+        elif display_device is None:
+            if auto is None:
+                raise RuntimeError("The inky library is not installed; set INKY_SIMULATE to run without a panel")
+            display_device = auto(ask_user=False, verbose=False)
+            print(f"Detected Inky display with resolution {display_device.resolution}")
+        return display_device
+
+def prerender_worker():
+    """Worker function for rendering upcoming cycle frames into the frame cache"""
+    while True:
+        generation, image_data, saturation = prerender_queue.get()
+        if generation != prerender_generation:
+            continue
+        
+        try:
+            if not os.path.exists(image_data['filepath']):
+                continue
+            
+            inky = get_display()
+            key = imaging.frame_cache_key(image_data['id'], file_content_hash(image_data['filepath']),
+                                          inky.resolution, saturation, get_quantize_method())
+            with frame_cache_lock:
+                cached = key in frame_cache_index
+            
+            if not cached:
+                get_display_frame(image_data['filepath'], inky, saturation, image_data['id'])
+                print(f"Pre-rendered frame for {image_data['filename']}")
+        except Exception as e:
+            print(f"Error pre-rendering {image_data['filename']}: {e}")
+
+def cancel_prerender():
+    """Drop all pending pre-render jobs"""
+    global prerender_generation
+    
+    prerender_generation += 1
+    while True:
+        try:
+            prerender_queue.get_nowait()
+        except queue.Empty:
+            break
+
+def schedule_prerender(images, saturation):
+    """Queue the next frames of the cycle for rendering in the background"""
+    global prerender_thread
+    
+    cancel_prerender()
+    
+    if not images:
+        return
+    
+    if not (prerender_thread and prerender_thread.is_alive()):
+        prerender_thread = threading.Thread(target=prerender_worker, daemon=True)
+        prerender_thread.start()
+    
+    generation = prerender_generation
+    for image_data in images:
+        try:
+            prerender_queue.put_nowait((generation, image_data, saturation))
+        except queue.Full:
+            break
+
+def get_display_colour(inky, name):
+    """Map a colour name from settings to the panel's palette index"""
+    if name.lower() == 'clean':
+        return CLEAN
+    
+    colour = getattr(inky, name.upper(), None)
+    if not isinstance(colour, int):
+        print(f"Unknown display colour '{name}', using white")
+        return inky.WHITE
+    return colour
+
+def fill_display(inky, colour):
+    """Set every pixel in the panel buffer to a single palette colour"""
+    buf = getattr(inky, 'buf', None)
+    if buf is not None and hasattr(buf, 'fill'):
+        buf.fill(colour)
+    else:
+        inky.set_image(Image.new('P', inky.resolution, colour))
+
+def set_job_status(job, status):
+    """Record a display job moving to a new phase"""
+    if job is not None:
+        job['status'] = status
+        job['phases'][status] = time.time()
+
+def get_frame_hash(inky):
+    """Hash the panel buffer, or None if the driver does not expose one"""
+    buf = getattr(inky, 'buf', None)
+    if buf is None:
+        return None
+    data = buf.tobytes() if hasattr(buf, 'tobytes') else bytes(buf)
+    return hashlib.sha256(f"{inky.resolution}".encode() + data).hexdigest()
+
+def get_shown_frame_hash():
+    """Get the hash of the frame on the panel, read from disk the first time"""
+    global shown_frame_hash, shown_frame_loaded
+    
+    if not shown_frame_loaded:
+        try:
+            with open(DISPLAY_STATE_FILE, 'r') as f:
+                shown_frame_hash = json.load(f).get('frame_hash')
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error reading {DISPLAY_STATE_FILE}: {e}")
+        shown_frame_loaded = True
+    return shown_frame_hash
+
+def set_shown_frame_hash(frame_hash):
+    """Remember the frame on the panel across restarts (None when it is unknown)"""
+    global shown_frame_hash, shown_frame_loaded
+    
+    shown_frame_hash = frame_hash
+    shown_frame_loaded = True
+    try:
+        temp_path = imaging.temp_path_for(DISPLAY_STATE_FILE)
+        with open(temp_path, 'w') as f:
+            json.dump({'frame_hash': frame_hash, 'shown_at': time.time()}, f)
+        os.replace(temp_path, DISPLAY_STATE_FILE)
+    except Exception as e:
+        print(f"Error writing {DISPLAY_STATE_FILE}: {e}")
+
+def is_frame_shown(inky):
+    """Check whether the panel already shows the buffer"""
+    frame_hash = get_frame_hash(inky)
+    return frame_hash is not None and frame_hash == get_shown_frame_hash()
+
+def show_frame(inky):
+    """Refresh the panel with its buffer and record what it now shows"""
+    frame_hash = get_frame_hash(inky)
+    try:
+        inky.show()
+    except Exception:
+        # A refresh that failed part way leaves the panel in an unknown state
+        set_shown_frame_hash(None)
+        raise
+    set_shown_frame_hash(frame_hash)
+
+def skip_refresh(job, reason):
+    """Record a display job that finished without refreshing the panel"""
+    print(f"{reason}, skipping refresh")
+    if job is not None:
+        job['skipped'] = True
+
+def clear_display(job=None, force=False):
+    """Clear the Inky display, unless it is already clear and force is not set"""
+    try:
+        inky = get_display()
+        set_job_status(job, 'refreshing')
+        
+        settings = load_settings()
+        passes = max(1, int(settings.get('clear_passes', 2)))
+        colours = [get_display_colour(inky, name) for name in settings.get('clear_colours') or ['white']]
+        
+        # The last pass decides what the panel ends up showing
+        fill_display(inky, colours[(passes - 1) % len(colours)])
+        if not force and is_frame_shown(inky):
+            skip_refresh(job, "Display is already clear")
+            return True
+        
+        for i in range(passes):
+            fill_display(inky, colours[i % len(colours)])
+            show_frame(inky)
+            if i < passes - 1:
+                time.sleep(1.0)
         return True
     except Exception as e:
         print(f"Error clearing display: {e}")
+        if job is not None:
+            job['error'] = str(e)
         return False
 
-def display_image_on_inky(image_path, saturation=0.5):
-    """Display an image on the Inky display"""
+def display_image_on_inky(image_path, saturation=0.5, image_id=None, job=None, force=False):
+    """Display an image on the Inky display, unless it already shows the same frame and force is not set"""
     try:
-        inky = auto(ask_user=False, verbose=False)
+        inky = get_display()
         
-        # Open and resize image
-        image = Image.open(image_path)
-        resized_image = image.resize(inky.resolution)
+        # Resized and palette-mapped frame, from the cache when possible
+        set_job_status(job, 'rendering')
+        frame = get_display_frame(image_path, inky, saturation, image_id)
+        set_job_status(job, 'refreshing')
         
         # Set image on display
         try:
-            inky.set_image(resized_image, saturation=saturation)
+            inky.set_image(frame, saturation=saturation)
         except TypeError:
-            inky.set_image(resized_image)
+            inky.set_image(frame)
         
-        inky.show()
+        if not force and is_frame_shown(inky):
+            skip_refresh(job, "Display already shows this frame")
+            return True
+        
+        show_frame(inky)
         return True
     except Exception as e:
         print(f"Error displaying image: {e}")
+        if job is not None:
+            job['error'] = str(e)
         return False
 
-def get_images_by_album(album_id=None):
-    """Get images filtered by album"""
-    conn = get_db_connection()
+def create_job(kind, **params):
+    """Register a job so its status can be looked up at /jobs/<id>"""
+    job = {
+        'id': next(display_job_ids),
+        'kind': kind,
+        'params': params,
+        'status': 'queued',
+        'error': None,
+        'skipped': False,  # finished without a refresh because the panel already showed the frame
+        'created_at': time.time(),
+        'started_at': None,
+        'finished_at': None,
+        'phases': {},  # status -> time the job entered it
+        'done': threading.Event()
+    }
     
-    if album_id and album_id != 1:  # Not "All Images"
-        images = conn.execute('''
-            SELECT i.*, a.name as album_name 
-            FROM images i 
-            LEFT JOIN albums a ON i.album_id = a.id 
-            WHERE i.album_id = ? 
-            ORDER BY i.created_at DESC
-        ''', (album_id,)).fetchall()
+    with display_jobs_condition:
+        display_jobs[job['id']] = job
+        while len(display_jobs) > MAX_DISPLAY_JOBS:
+            display_jobs.popitem(last=False)
+    return job
+
+def submit_display_job(kind, **params):
+    """Queue a display job, superseding any queued job that has not started yet"""
+    global pending_display_job
+    
+    job = create_job(kind, **params)
+    
+    with display_jobs_condition:
+        if pending_display_job is not None:
+            # Only the newest request is worth a full panel refresh
+            pending_display_job['status'] = 'superseded'
+            pending_display_job['finished_at'] = job['created_at']
+            pending_display_job['done'].set()
+        
+        pending_display_job = job
+        display_jobs_condition.notify()
+    
+    start_display_worker()
+    return job
+
+def queue_display_image(image_path, saturation=0.5, image_id=None, force=False):
+    """Queue an image for the Inky display; force refreshes even if it is already shown"""
+    return submit_display_job('display', image_path=image_path, saturation=saturation, image_id=image_id,
+                              force=force)
+
+def queue_clear_display(force=False):
+    """Queue a clear of the Inky display; force refreshes even if it is already clear"""
+    return submit_display_job('clear', force=force)
+
+def wait_for_display_job(job):
+    """Wait for a display job to finish; returns False if it failed"""
+    job['done'].wait()
+    return job['status'] != 'failed'
+
+def display_job_to_dict(job):
+    """Get the JSON-friendly status of a display job, with per-phase timings in seconds"""
+    phases = job['phases']
+    end = job['finished_at'] or time.time()
+    timings = {'queued': round((job['started_at'] or end) - job['created_at'], 3)}
+    if 'rendering' in phases:
+        timings['rendering'] = round(phases.get('refreshing', end) - phases['rendering'], 3)
+    if 'refreshing' in phases:
+        timings['refreshing'] = round(end - phases['refreshing'], 3)
+    timings['total'] = round(end - job['created_at'], 3)
+    
+    result = {
+        'job_id': job['id'],
+        'kind': job['kind'],
+        'image_id': job['params'].get('image_id'),
+        'status': job['status'],
+        'error': job['error'],
+        'skipped': job['skipped'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+        'timings': timings
+    }
+    if 'progress' in job:
+        result['progress'] = dict(job['progress'])
+    return result
+
+def run_display_job(job):
+    """Run a single display job on the display worker thread"""
+    job['started_at'] = time.time()
+    
+    if job['kind'] == 'clear':
+        success = clear_display(job, **job['params'])
     else:
-        images = conn.execute('''
-            SELECT i.*, a.name as album_name 
-            FROM images i 
-            LEFT JOIN albums a ON i.album_id = a.id 
-            ORDER BY i.created_at DESC
-        ''').fetchall()
+        success = display_image_on_inky(job=job, **job['params'])
+    
+    job['status'] = 'done' if success else 'failed'
+    job['finished_at'] = time.time()
+    job['done'].set()
+
+def display_worker():
+    """Worker function that owns the Inky display and runs display jobs one at a time"""
+    global pending_display_job
+    
+    try:
+        get_display()
+    except Exception as e:
+        print(f"Error detecting display: {e}")
+    
+    while True:
+        with display_jobs_condition:
+            while pending_display_job is None:
+                display_jobs_condition.wait()
+            job = pending_display_job
+            pending_display_job = None
+        
+        try:
+            run_display_job(job)
+        except Exception as e:
+            print(f"Error in display worker: {e}")
+            job['status'] = 'failed'
+            job['error'] = str(e)
+            job['finished_at'] = time.time()
+            job['done'].set()
+
+def start_display_worker():
+    """Start the display worker thread if it is not running"""
+    global display_thread
     
+    with display_jobs_condition:
+        if display_thread and display_thread.is_alive():
+            return
+        display_thread = threading.Thread(target=display_worker, daemon=True)
+        display_thread.start()
+
+def get_images_by_album(album_id=None, limit=None, after=None, fields=None):
+    """Get images filtered by album, newest first
+    
+    With limit, returns one page starting after the (created_at, id) cursor; the
+    ordering matches the (album_id, created_at, id) index so each page is a range scan.
+    """
+    columns = ['i.*', 'a.name as album_name']
+    if fields:
+        columns = [IMAGE_FIELDS[field] for field in fields]
+    
+    query = f'SELECT {", ".join(columns)} FROM images i LEFT JOIN albums a ON i.album_id = a.id'
+    conditions = []
+    params = []
+    
+    if album_id and album_id != 1:  # Not "All Images"
+        conditions.append('i.album_id = ?')
+        params.append(album_id)
+    if after:
+        conditions.append('(i.created_at, i.id) < (?, ?)')
+        params.extend(after)
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += ' ORDER BY i.created_at DESC, i.id DESC'
+    if limit:
+        query += ' LIMIT ?'
+        params.append(limit)
+    
+    conn = get_db_connection()
+    images = conn.execute(query, params).fetchall()
     conn.close()
     return [dict(img) for img in images]
 
+def parse_image_page_args(args):
+    """Read limit, after and fields from the query string; limit is None for the full list"""
+    limit = args.get('limit', type=int)
+    if limit is not None and limit <= 0:
+        raise ValueError('limit must be positive')
+    if limit:
+        limit = min(limit, MAX_PAGE_SIZE)
+    
+    after = None
+    if args.get('after'):
+        created_at, _, image_id = args['after'].rpartition(',')
+        if not created_at or not image_id.isdigit():
+            raise ValueError('after must be "<created_at>,<id>"')
+        after = (created_at, int(image_id))
+    
+    fields = None
+    if args.get('fields'):
+        fields = [field.strip() for field in args['fields'].split(',') if field.strip()]
+        unknown = [field for field in fields if field not in IMAGE_FIELDS]
+        if unknown:
+            raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+        # The cursor is built from these, so they always come back
+        fields = ['id', 'created_at'] + [field for field in fields if field not in ('id', 'created_at')]
+    
+    return limit, after, fields
+
+def image_page_response(album_id):
+    """Full list as before, or {images, next_cursor} when a limit is given"""
+    try:
+        limit, after, fields = parse_image_page_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not limit:
+        return jsonify(get_images_by_album(album_id, after=after, fields=fields))
+    
+    # One extra row tells us whether there is another page
+    images = get_images_by_album(album_id, limit + 1, after, fields)
+    next_cursor = None
+    if len(images) > limit:
+        images = images[:limit]
+        next_cursor = f"{images[-1]['created_at']},{images[-1]['id']}"
+    
+    return jsonify({'images': images, 'next_cursor': next_cursor})
+
 def get_all_images():
     """Get all image files (for backward compatibility)"""
     return get_images_by_album()
 
-def add_image_to_db(filename, original_filename, filepath, album_id=None, file_size=0, image_type=''):
-    """Add image record to database"""
+def get_image_by_id(image_id):
+    """Get a single image record"""
     conn = get_db_connection()
-    cursor = conn.cursor()
+    image = conn.execute('SELECT * FROM images WHERE id = ?', (image_id,)).fetchone()
+    conn.close()
+    return dict(image) if image else None
+
+class Playlist:
+    """Cycle order for an album, patched by image events instead of reloading the album
     
-    cursor.execute('''
-        INSERT INTO images (filename, original_filename, filepath, album_id, file_size, image_type)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (filename, original_filename, filepath, album_id, file_size, image_type))
+    Only image ids are held in memory. Sequential orders keep position pointing at the
+    next image to show, and inserts/removals shift it so the rotation carries on where
+    it was instead of restarting.
+    """
     
-    image_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    ORDERS = ('newest', 'oldest', 'shuffle', 'weighted')
+    
+    def __init__(self, album_id, order='newest'):
+        self.album_id = album_id
+        self.order = order if order in self.ORDERS else 'newest'
+        self.lock = threading.Lock()
+        self.position = 0
+        self.history = deque(maxlen=PLAYLIST_HISTORY)  # ids shown, most recent last
+        self.upcoming = deque()  # weighted picks made ahead of time so they can be pre-rendered
+        self.pending_id = None  # set by previous(), shown next
+        self.ids = self.load_ids()
+        if self.order == 'shuffle':
+            random.shuffle(self.ids)
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    def includes_all(self):
+        return not self.album_id or self.album_id == 1  # "All Images"
+    
+    def load_ids(self):
+        conn = get_db_connection()
+        if self.includes_all():
+            rows = conn.execute('SELECT id FROM images ORDER BY created_at DESC, id DESC').fetchall()
+        else:
+            rows = conn.execute('SELECT id FROM images WHERE album_id = ? ORDER BY created_at DESC, id DESC',
+                                (self.album_id,)).fetchall()
+        conn.close()
+        
+        ids = [row[0] for row in rows]
+        if self.order == 'oldest':
+            ids.reverse()
+        return ids
+    
+    def sorted_index(self, image_id):
+        """Find where an image belongs in newest/oldest order with an indexed count"""
+        conn = get_db_connection()
+        image = conn.execute('SELECT created_at FROM images WHERE id = ?', (image_id,)).fetchone()
+        newer = 0
+        if image:
+            query = 'SELECT COUNT(*) FROM images WHERE (created_at, id) > (?, ?)'
+            params = [image['created_at'], image_id]
+            if not self.includes_all():
+                query += ' AND album_id = ?'
+                params.append(self.album_id)
+            newer = conn.execute(query, params).fetchone()[0]
+        conn.close()
+        return newer
+    
+    def pick_weighted(self):
+        """Pick an image at random, newer images more often (weight falls linearly with age)"""
+        last = self.upcoming[-1] if self.upcoming else (self.history[-1] if self.history else None)
+        for _ in range(3):
+            image_id = random.choices(self.ids, weights=range(len(self.ids), 0, -1))[0]
+            if image_id != last:
+                break
+        return image_id
+    
+    def next_image_id(self):
+        """Advance the playlist and get the id of the image to show, or None if it is empty"""
+        with self.lock:
+            if not self.ids:
+                return None
+            
+            if self.pending_id in self.ids:
+                image_id = self.pending_id
+                if self.order != 'weighted':
+                    self.position = self.ids.index(image_id) + 1
+            elif self.order == 'weighted':
+                image_id = self.upcoming.popleft() if self.upcoming else self.pick_weighted()
+            else:
+                if self.position >= len(self.ids):
+                    self.position = 0  # Loop back to start
+                    if self.order == 'shuffle':
+                        random.shuffle(self.ids)
+                image_id = self.ids[self.position]
+                self.position += 1
+            
+            self.pending_id = None
+            self.history.append(image_id)
+            return image_id
+    
+    def peek(self, count):
+        """Get the ids of the next count images without advancing"""
+        with self.lock:
+            if not self.ids or count <= 0:
+                return []
+            if self.order == 'weighted':
+                while len(self.upcoming) < count:
+                    self.upcoming.append(self.pick_weighted())
+                return list(self.upcoming)[:count]
+            return [self.ids[(self.position + offset) % len(self.ids)]
+                    for offset in range(min(count, len(self.ids)))]
+    
+    def current_number(self):
+        """Get the 1-based position of the image on the panel, 0 before the first"""
+        with self.lock:
+            if not self.history:
+                return 0
+            if self.order != 'weighted':
+                return self.position
+            try:
+                return self.ids.index(self.history[-1]) + 1
+            except ValueError:
+                return 0
+    
+    def previous(self):
+        """Show the image before the current one next"""
+        with self.lock:
+            if len(self.history) < 2:
+                return
+            self.history.pop()
+            self.pending_id = self.history.pop()
+    
+    def skip(self):
+        """Drop the upcoming image from this round"""
+        with self.lock:
+            if self.order == 'weighted':
+                if self.upcoming:
+                    self.upcoming.popleft()
+            elif self.ids:
+                self.position = self.position % len(self.ids) + 1
+    
+    def image_added(self, image_id, album_id):
+        if not (self.includes_all() or album_id == self.album_id):
+            return
+        
+        index = self.sorted_index(image_id) if self.order in ('newest', 'oldest', 'weighted') else None
+        with self.lock:
+            if image_id in self.ids:
+                return
+            if self.order == 'shuffle':
+                # Somewhere in the rest of this round
+                index = random.randint(min(self.position, len(self.ids)), len(self.ids))
+            elif self.order == 'oldest':
+                index = len(self.ids) - index
+            index = max(0, min(index, len(self.ids)))
+            
+            self.ids.insert(index, image_id)
+            if index < self.position:
+                self.position += 1
+            self.upcoming.clear()
+    
+    def image_removed(self, image_id):
+        with self.lock:
+            try:
+                index = self.ids.index(image_id)
+            except ValueError:
+                return
+            
+            del self.ids[index]
+            if index < self.position:
+                self.position -= 1
+            if self.pending_id == image_id:
+                self.pending_id = None
+            self.upcoming = deque(i for i in self.upcoming if i != image_id)
+    
+    def image_moved(self, image_id, old_album_id, new_album_id):
+        if self.includes_all():
+            return
+        if new_album_id == self.album_id:
+            self.image_added(image_id, new_album_id)
+        elif old_album_id == self.album_id:
+            self.image_removed(image_id)
+    
+    def album_deleted(self, album_id):
+        if album_id == self.album_id:
+            with self.lock:
+                self.ids = []
+                self.position = 0
+                self.upcoming.clear()
+
+def publish_image_event(event, image_id=None, album_id=None, old_album_id=None):
+    """Tell the active playlist that an image was added, moved or deleted, or an album deleted"""
+    playlist = current_playlist
+    if playlist is None:
+        return
+    
+    if event == 'added':
+        playlist.image_added(image_id, album_id)
+    elif event == 'moved':
+        playlist.image_moved(image_id, old_album_id, album_id)
+    elif event == 'deleted':
+        playlist.image_removed(image_id)
+    elif event == 'album_deleted':
+        playlist.album_deleted(album_id)
+    record_status_change()
+
+def add_image_to_db(filename, original_filename, filepath, album_id=None, file_size=0, image_type='',
+                    content_hash=None):
+    """Add image record to database"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            INSERT INTO images (filename, original_filename, filepath, album_id, file_size, image_type, content_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (filename, original_filename, filepath, album_id, file_size, image_type, content_hash))
+        
+        image_id = cursor.lastrowid
+        conn.commit()
+    finally:
+        # Hand the connection back even on failure, or its open transaction keeps the database locked
+        conn.close()
+    
+    update_album_image_count(album_id, 1)
+    publish_image_event('added', image_id, album_id)
     return image_id
 
+def album_exists(album_id):
+    """Check an album id against the album name cache"""
+    with status_condition:
+        return album_id in album_names
+
+def discard_unreferenced_file(filepath):
+    """Remove a stored image file that no row points at, e.g. after its insert failed
+    
+    The caller holds the file's content_lock.
+    """
+    conn = get_db_connection()
+    try:
+        references = conn.execute('SELECT COUNT(*) FROM images WHERE filepath = ?', (filepath,)).fetchone()[0]
+    finally:
+        conn.close()
+    
+    if references == 0:
+        try:
+            delete_thumbnails(file_content_hash(filepath))
+            os.remove(filepath)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error removing unreferenced file {filepath}: {e}")
+
 def delete_image_from_db(image_id):
-    """Delete image from database and filesystem"""
+    """Delete image from database, and from the filesystem once nothing references it"""
     conn = get_db_connection()
     
     # Get image info first
     image = conn.execute('SELECT * FROM images WHERE id = ?', (image_id,)).fetchone()
     
     if image:
-        # Delete from filesystem
-        try:
-            if os.path.exists(image['filepath']):
-                os.remove(image['filepath'])
-        except Exception as e:
-            print(f"Error deleting file {image['filepath']}: {e}")
+        # Nothing can add a reference to the file between the count and the remove
+        with content_lock(image['content_hash'] or '0'):
+            # Delete from database
+            conn.execute('DELETE FROM images WHERE id = ?', (image_id,))
+            conn.commit()
+            
+            references = 0
+            if image['content_hash']:
+                references = conn.execute('SELECT COUNT(*) FROM images WHERE content_hash = ? AND filepath = ?',
+                                          (image['content_hash'], image['filepath'])).fetchone()[0]
+            
+            # Delete from filesystem
+            if references == 0:
+                try:
+                    if os.path.exists(image['filepath']):
+                        delete_thumbnails(file_content_hash(image['filepath']))
+                        os.remove(image['filepath'])
+                except Exception as e:
+                    print(f"Error deleting file {image['filepath']}: {e}")
+        
+        invalidate_frame_cache(image_id)
+        update_album_image_count(image['album_id'], -1)
+        publish_image_event('deleted', image_id)
         
-        # Delete from database
-        conn.execute('DELETE FROM images WHERE id = ?', (image_id,))
-        conn.commit()
         conn.close()
         return True
     
     conn.close()
     return False
 
+def collect_import_sources(path, recursive=True):
+    """List the image files in a directory as (path, original filename) pairs"""
+    if os.path.isfile(path):
+        return [(path, os.path.basename(path))]
+    
+    sources = []
+    for root, dirs, files in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.')) if recursive else []
+        for name in sorted(files):
+            if allowed_file(name) and not name.startswith('.'):
+                sources.append((os.path.join(root, name), name))
+    return sources
+
+def zip_image_members(archive, max_total=IMPORT_MAX_CONTENT_LENGTH, max_members=IMPORT_MAX_FILES):
+    """The image members of an open ZIP, checked against the import limits from its directory alone
+    
+    Raises ValueError if there are more than max_members images or they claim more than
+    max_total bytes uncompressed; None skips a check.
+    """
+    members = [member for member in archive.infolist()
+               if not member.is_dir() and not os.path.basename(member.filename).startswith('.')
+               and allowed_file(os.path.basename(member.filename))]
+    
+    if max_members is not None and len(members) > max_members:
+        raise ValueError(f'ZIP has {len(members)} images, the limit is {max_members}')
+    if max_total is not None and sum(member.file_size for member in members) > max_total:
+        raise ValueError(f'ZIP expands to more than {max_total // (1024 * 1024)}MB')
+    return members
+
+def extract_zip_sources(zip_path, dest_dir, max_bytes=MAX_CONTENT_LENGTH, max_total=IMPORT_MAX_CONTENT_LENGTH,
+                        max_members=IMPORT_MAX_FILES):
+    """Extract the images in a ZIP into dest_dir; returns (path, original filename) pairs
+    
+    Members are written under generated names, so paths inside the archive can't
+    escape dest_dir. The limits are checked before anything is written (see
+    zip_image_members), and as the data comes out, since sizes in the headers can lie:
+    each copy stops just past max_bytes and the whole extraction fails past max_total.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    sources = []
+    total = 0
+    
+    with zipfile.ZipFile(zip_path) as archive:
+        for index, member in enumerate(zip_image_members(archive, max_total, max_members)):
+            name = os.path.basename(member.filename)
+            target = os.path.join(dest_dir, f"{index}{os.path.splitext(name)[1].lower()}")
+            copied = 0
+            with archive.open(member) as src, open(target, 'wb') as dst:
+                for chunk in iter(lambda: src.read(INGEST_CHUNK_SIZE), b''):
+                    dst.write(chunk)
+                    copied += len(chunk)
+                    if copied > max_bytes:
+                        break  # ingest rejects it as too large
+            
+            total += copied
+            if max_total is not None and total > max_total:
+                raise ValueError(f'ZIP expands to more than {max_total // (1024 * 1024)}MB')
+            sources.append((target, name))
+    
+    return sources
+
+def import_images(sources, album_id=1, job=None, prerender=False):
+    """Add many image files to an album at once, without touching the display
+    
+    Storing, validating and thumbnailing run in the image pool; the rows then go in
+    with one executemany in a single transaction. Images already in the album are
+    counted as duplicates. Progress is kept on job['progress'] and returned.
+    """
+    progress = {'total': len(sources), 'processed': 0, 'imported': 0, 'duplicates': 0, 'failed': 0}
+    if job is not None:
+        job['progress'] = progress
+        job['started_at'] = time.time()
+        job['status'] = 'running'
+    
+    settings = load_settings()
+    master_size = int(settings.get('display_master_size') or 0)
+    stored = []
+    
+    tasks = [(path, UPLOAD_FOLDER, os.path.splitext(name)[1], MAX_CONTENT_LENGTH, master_size,
+              THUMBNAIL_FOLDER, THUMBNAIL_SIZES[1], THUMBNAIL_FORMAT) for path, name in sources]
+    for index, future in run_image_tasks(imaging.import_image, tasks):
+        name = sources[index][1]
+        try:
+            stored.append((name, future.result(), tasks[index]))
+        except Exception as e:
+            progress['failed'] += 1
+            print(f"Skipping {name}: {e}")
+        
+        progress['processed'] += 1
+        if progress['processed'] % IMPORT_PROGRESS_EVERY == 0 or progress['processed'] == progress['total']:
+            print(f"Import: {progress['processed']}/{progress['total']} processed")
+    
+    # Deletes of the same content wait until the rows are in (any fixed order avoids deadlocks)
+    locks = sorted({content_lock(info['content_hash']) for _, info, _ in stored}, key=id)
+    for lock in locks:
+        lock.acquire()
+    try:
+        for index, (name, info, task) in enumerate(stored):
+            if not os.path.exists(info['filepath']):
+                # Removed by a delete of the same content since the pool stored it
+                stored[index] = (name, run_image_task(imaging.import_image, *task), task)
+        
+        # One transaction for the whole batch
+        conn = get_db_connection()
+        try:
+            conn.execute('BEGIN IMMEDIATE')  # hold the write lock so the new ids are ours alone
+            existing = {row[0] for row in conn.execute(
+                'SELECT content_hash FROM images WHERE album_id IS ? AND content_hash IS NOT NULL', (album_id,))}
+            
+            rows = []
+            for name, info, _ in stored:
+                if info['content_hash'] in existing:
+                    progress['duplicates'] += 1
+                    continue
+                existing.add(info['content_hash'])
+                rows.append((os.path.basename(info['filepath']), name, info['filepath'], album_id,
+                             info['file_size'], 'imported', info['content_hash']))
+            
+            last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM images').fetchone()[0]
+            conn.executemany('''
+                INSERT INTO images (filename, original_filename, filepath, album_id, file_size, image_type, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            new_images = conn.execute('SELECT id, filepath, content_hash FROM images WHERE id > ? ORDER BY id',
+                                      (last_id,)).fetchall()
+            conn.commit()
+        finally:
+            conn.close()
+        
+        for image in new_images:
+            stat = os.stat(image['filepath'])
+            content_hash_memo[(os.path.abspath(image['filepath']), stat.st_mtime_ns, stat.st_size)] = image['content_hash']
+    finally:
+        for lock in locks:
+            lock.release()
+    
+    progress['imported'] = len(new_images)
+    
+    if new_images:
+        update_album_image_count(album_id, len(new_images))
+        for image in new_images:
+            publish_image_event('added', image['id'], album_id)
+    
+    if prerender and new_images:
+        # Frames need the image ids, so they are rendered after the insert
+        inky = get_display()
+        palette = get_display_palette(inky, settings['saturation'])
+        method = get_quantize_method()
+        keys = [imaging.frame_cache_key(image['id'], image['content_hash'], inky.resolution, settings['saturation'],
+                                        method)
+                for image in new_images]
+        tasks = [(image['filepath'], inky.resolution, palette, os.path.join(FRAME_CACHE_FOLDER, key), method)
+                 for image, key in zip(new_images, keys)]
+        for index, future in run_image_tasks(imaging.render_frame_file, tasks):
+            try:
+                register_cached_frame(keys[index], future.result())
+            except Exception as e:
+                print(f"Error pre-rendering {keys[index]}: {e}")
+    
+    print(f"Import finished: {progress['imported']} imported, {progress['duplicates']} duplicates, "
+          f"{progress['failed']} failed")
+    return progress
+
+def run_import_job(job, sources, album_id, prerender=False, cleanup_dir=None, archives=()):
+    """Run an import in the background, removing its temporary files afterwards
+    
+    archives are (zip path, directory) pairs, extracted here before the import.
+    """
+    try:
+        if archives:
+            job['status'] = 'extracting'
+            sources = list(sources)
+            for zip_path, dest_dir in archives:
+                sources += extract_zip_sources(zip_path, dest_dir)
+                os.remove(zip_path)
+        import_images(sources, album_id, job, prerender)
+        job['status'] = 'done'
+    except Exception as e:
+        print(f"Import failed: {e}")
+        job['status'] = 'failed'
+        job['error'] = str(e)
+    finally:
+        job['finished_at'] = time.time()
+        job['done'].set()
+        if cleanup_dir:
+            shutil.rmtree(cleanup_dir, ignore_errors=True)
+
 def generate_random_prompt():
     """Generate a random prompt using GPT-3.5"""
     try:
@@ -242,167 +1636,357 @@ def generate_random_prompt():
         print(f"Error generating prompt: {e}")
         return "abstract digital art"
 
-def generate_ai_image():
-    """Generate an AI image using DALL-E"""
+def generate_random_prompts(count):
+    """Generate count different prompts with a single GPT-3.5 call"""
+    if count <= 1:
+        return [generate_random_prompt()]
+    
     try:
-        # Generate a random prompt using GPT-3.5
-        prompt = generate_random_prompt()
-        print("Generated prompt:", prompt)
-
-        # Generate an image from the random prompt
-        response = openai.Image.create(
-            prompt=prompt,
-            n=1,
-            size="1024x1024"
+        completion = openai.ChatCompletion.create(
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", 
+                 "content": f"Create {count} different concise image prompts (max 5 words each), specifying art "
+                            "style, subject, and details. Reply with one prompt per line and nothing else."
+                },
+            ]
         )
+        lines = completion.choices[0].message['content'].splitlines()
+    except Exception as e:
+        print(f"Error generating prompts: {e}")
+        lines = []
+    
+    # Drop numbering, bullets and quotes the model may add
+    prompts = [re.sub(r'^\s*(\d+[.)]|[-*•])\s*', '', line).strip().strip('"') for line in lines]
+    prompts = [prompt for prompt in prompts if prompt][:count]
+    if not prompts:
+        prompts = ["abstract digital art"]
+    return prompts
+
+def generate_ai_images(prompts, images_per_prompt=1, album_id=None):
+    """Generate images_per_prompt DALL-E images for each prompt, one image request per prompt
+    
+    Returns [(path, prompt, image_id)]. A failing prompt is skipped; errors are only
+    raised when nothing could be generated, so the caller can back off.
+    """
+    results = []
+    error = None
+    
+    for prompt in prompts:
+        print("Generated prompt:", prompt)
+        try:
+            # Generate all images for this prompt in one request
+            response = openai.Image.create(
+                prompt=prompt,
+                n=images_per_prompt,
+                size="1024x1024"
+            )
+        except Exception as e:
+            print(f"Error generating images for '{prompt}': {e}")
+            error = e
+            continue
         
-        # Get the image URL
-        image_url = response['data'][0]['url']
-        print("Image URL:", image_url)
-        
-        # Download the image
-        image_response = requests.get(image_url)
-        image = Image.open(BytesIO(image_response.content))
+        for number, item in enumerate(response['data'], start=1):
+            try:
+                # Download the image
+                image_url = item['url']
+                print("Image URL:", image_url)
+                image_response = http_client.open_download(image_url, MAX_CONTENT_LENGTH)
+                
+                # Save the image as it arrives and add it to the database
+                suffix = f"_{number}" if number > 1 else ""
+                image_id, final_image_path = add_image_from_stream(
+                    http_client.iter_download(image_response, INGEST_CHUNK_SIZE), PICTURES_FOLDER, '.png',
+                    sanitize_filename(prompt) + suffix + ".png", album_id=album_id, image_type='ai_generated')
+                results.append((final_image_path, prompt, image_id))
+            except Exception as e:
+                print(f"Error saving image for '{prompt}': {e}")
+                error = e
+    
+    if not results and error:
+        raise error
+    return results
+
+def generate_ai_batch(prompt_count, images_per_prompt, album_id=None):
+    """Generate a batch of AI images into an album: prompt_count prompts, images_per_prompt each"""
+    prompt_count = max(1, min(int(prompt_count), MAX_AI_BATCH_PROMPTS))
+    images_per_prompt = max(1, min(int(images_per_prompt), MAX_AI_IMAGES_PER_PROMPT))
+    return generate_ai_images(generate_random_prompts(prompt_count), images_per_prompt, album_id)
+
+def ai_retry_delay(error, failures):
+    """Seconds to wait after a failed generation: the server's Retry-After for rate limits, else exponential"""
+    rate_limit_error = getattr(getattr(openai, 'error', None), 'RateLimitError', None)
+    status = getattr(error, 'http_status', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+    
+    if (rate_limit_error and isinstance(error, rate_limit_error)) or status == 429:
+        headers = getattr(error, 'headers', None) or getattr(getattr(error, 'response', None), 'headers', None) or {}
+        try:
+            return min(float(headers.get('Retry-After')), AI_RETRY_MAX_DELAY)
+        except (TypeError, ValueError):
+            pass
+    
+    return min(AI_RETRY_DELAY * 2 ** (failures - 1), AI_RETRY_MAX_DELAY)
+
+def ai_pool_should_run(generation):
+    return generation == worker_generation and ai_mode_active
+
+def ai_pool_worker(generation):
+    """Keep ai_pool_size AI images generated, downloaded and pre-rendered ahead of the AI cycle"""
+    print("AI pool worker started")
+    failures = 0
+    
+    while ai_pool_should_run(generation):
+        settings = load_settings()
+        with ai_pool_condition:
+            if len(ai_pool) >= max(1, int(settings.get('ai_pool_size', 2))):
+                # Full: sleep until an image is taken, the size changes or AI mode stops
+                ai_pool_condition.wait()
+                continue
         
-        # Save the image 
-        sanitized_filename = sanitize_filename(prompt) + ".png"
-        final_image_path = os.path.join(PICTURES_FOLDER, sanitized_filename)
-        image.save(final_image_path)
+        try:
+            # Fill the gap in as few requests as the batch settings allow
+            needed = max(1, int(settings.get('ai_pool_size', 2))) - len(ai_pool)
+            images_per_prompt = max(1, int(settings.get('ai_images_per_prompt', 1)))
+            prompt_count = min(int(settings.get('ai_batch_prompts', 1)), -(-needed // images_per_prompt))
+            generated = generate_ai_batch(prompt_count, images_per_prompt)
+            for image_path, prompt, image_id in generated:
+                get_display_frame(image_path, get_display(), settings['saturation'], image_id)
+        except Exception as e:
+            failures += 1
+            delay = ai_retry_delay(e, failures)
+            print(f"Error generating AI image (attempt {failures}), retrying in {delay:.0f}s: {e}")
+            with ai_pool_condition:
+                ai_pool_condition.wait_for(lambda: not ai_pool_should_run(generation), delay)
+            continue
         
-        # Add to database
-        file_size = os.path.getsize(final_image_path)
-        add_image_to_db(sanitized_filename, prompt + ".png", final_image_path, 
-                       album_id=None, file_size=file_size, image_type='ai_generated')
+        failures = 0
+        with ai_pool_condition:
+            ai_pool.extend({'image_id': image_id, 'path': image_path, 'prompt': prompt}
+                           for image_path, prompt, image_id in generated)
+            ai_pool_condition.notify_all()
+        record_status_change()
+        print(f"AI pool: {len(ai_pool)} ready")
+    
+    print("AI pool worker stopped")
+
+def wake_ai_pool():
+    """Wake the AI pool worker and anyone waiting for an image"""
+    with ai_pool_condition:
+        ai_pool_condition.notify_all()
+
+def take_ai_image(generation):
+    """Wait for the next ready AI image from the pool; None if AI mode stopped first"""
+    while True:
+        with ai_pool_condition:
+            ai_pool_condition.wait_for(lambda: ai_pool or not worker_should_run(generation))
+            if not worker_should_run(generation):
+                return None
+            entry = ai_pool.popleft()
+            ai_pool_condition.notify_all()  # room for the pool worker to refill
+        record_status_change()
         
-        return final_image_path, prompt
+        # Skip images deleted while they waited in the pool
+        if get_image_by_id(entry['image_id']) and os.path.exists(entry['path']):
+            return entry
 
-    except Exception as e:
-        print("Error generating AI image:", e)
-        return None, None
+def wake_scheduler(command=None):
+    """Wake the cycling worker early, optionally with a next/previous/skip command"""
+    global scheduler_command
+    
+    with scheduler_condition:
+        if command:
+            scheduler_command = command
+        scheduler_condition.notify_all()
 
-def cycling_worker():
+def worker_should_run(generation):
+    """Check whether a cycling worker started for this generation should keep going"""
+    return generation == worker_generation and (cycling_active or ai_mode_active)
+
+def wait_for_next_refresh(generation, started_at, interval):
+    """Sleep until interval seconds after started_at, waking early on stop or a command
+    
+    interval is either a number of seconds or the name of a setting, which is re-read on
+    every wake-up so a changed interval applies to the wait in progress. Returns the
+    command that ended the wait, or None.
+    """
+    global scheduler_command
+    
+    while worker_should_run(generation):
+        # Read settings outside the scheduler lock; the version check catches changes in between
+        version = settings_version
+        seconds = float(load_settings()[interval]) if isinstance(interval, str) else interval
+        
+        with scheduler_condition:
+            if scheduler_command:
+                command, scheduler_command = scheduler_command, None
+                return command
+            if settings_version != version or not worker_should_run(generation):
+                continue
+            
+            remaining = started_at + seconds - time.monotonic()
+            if remaining <= 0:
+                return None
+            scheduler_condition.wait(remaining)
+    
+    return None
+
+def cycling_worker(generation):
     """Worker function for cycling through images"""
-    global cycling_active, ai_mode_active, current_image_index, current_album_images
+    global current_playlist
     
     print("Cycling worker started")
     
-    while cycling_active or ai_mode_active:
+    settings = None
+    seen_settings_version = None
+    
+    while worker_should_run(generation):
         try:
-            settings = load_settings()
+            # Only copy the settings again when they have changed
+            if settings_version != seen_settings_version:
+                seen_settings_version = settings_version
+                settings = load_settings()
             print(f"Worker loop - cycling_active: {cycling_active}, ai_mode_active: {ai_mode_active}")
             
             if ai_mode_active:
-                # AI mode: generate new image
-                print("Generating AI image...")
-                image_path, prompt = generate_ai_image()
-                if image_path:
-                    display_image_on_inky(image_path, settings['saturation'])
-                    print(f"Displayed AI image: {prompt}")
+                # AI mode: show the next image from the prefetched pool
+                entry = take_ai_image(generation)
+                if entry is None:
+                    break
+                if wait_for_display_job(queue_display_image(entry['path'], settings['saturation'], entry['image_id'])):
+                    print(f"Displayed AI image: {entry['prompt']}")
                 else:
-                    print("Failed to generate AI image")
+                    print(f"Failed to display AI image: {entry['prompt']}")
                 
-                # Wait for AI generation interval
-                wait_time = int(settings['ai_generation_interval'])
-                print(f"Waiting {wait_time} seconds for next AI generation...")
-                for i in range(wait_time):
-                    if not ai_mode_active:
-                        print("AI mode stopped during wait")
-                        break
-                    time.sleep(1)
+                # Wait for AI generation interval; any command generates the next image now
+                print(f"Waiting {settings['ai_generation_interval']} seconds for next AI generation...")
+                wait_for_next_refresh(generation, time.monotonic(), 'ai_generation_interval')
                     
             elif cycling_active:
                 # Cycle mode: go through images in current album
-                current_album = settings.get('current_album', 1)
-                
-                # Refresh images list if empty or if album changed
-                if not current_album_images:
-                    current_album_images = get_images_by_album(current_album)
-                    current_image_index = 0
-                    print(f"Loaded {len(current_album_images)} images from album {current_album}")
+                if current_playlist is None:
+                    current_playlist = Playlist(settings.get('current_album', 1), settings.get('cycle_order', 'newest'))
+                    record_status_change()
+                    print(f"Loaded {len(current_playlist)} images from album {current_playlist.album_id}")
+                playlist = current_playlist
                 
-                if current_album_images:
-                    # Get current image
-                    if current_image_index >= len(current_album_images):
-                        current_image_index = 0  # Loop back to start
+                image_id = playlist.next_image_id()
+                if image_id is not None:
+                    image_data = get_image_by_id(image_id)
                     
-                    if current_image_index < len(current_album_images):
-                        image_data = current_album_images[current_image_index]
-                        
-                        # Check if file still exists
-                        if os.path.exists(image_data['filepath']):
-                            success = display_image_on_inky(image_data['filepath'], settings['saturation'])
-                            if success:
-                                print(f"Displayed image {current_image_index + 1}/{len(current_album_images)}: {image_data['filename']}")
-                            else:
-                                print(f"Failed to display: {image_data['filename']}")
+                    # Check if file still exists
+                    if image_data and os.path.exists(image_data['filepath']):
+                        job = queue_display_image(image_data['filepath'], settings['saturation'], image_id)
+                        success = wait_for_display_job(job)
+                        if success:
+                            print(f"Displayed image {playlist.current_number()}/{len(playlist)}: {image_data['filename']}")
                         else:
-                            print(f"File not found: {image_data['filepath']}")
-                        
-                        current_image_index += 1
+                            print(f"Failed to display: {image_data['filename']}")
+                    else:
+                        print(f"File not found for image {image_id}")
+                    
+                    # Stopped or restarted during the refresh; the cycle state is no longer ours
+                    if not worker_should_run(generation):
+                        break
+                    record_status_change()
+                    
+                    # Prepare the upcoming frames while this one is on the panel
+                    upcoming = [get_image_by_id(i) for i in playlist.peek(int(settings.get('prerender_ahead', 2)))]
+                    schedule_prerender([image for image in upcoming if image], settings['saturation'])
                     
                     # Wait for cycle time
-                    wait_time = int(settings['cycle_time'])
-                    print(f"Waiting {wait_time} seconds before next image...")
-                    for i in range(wait_time):
-                        if not cycling_active:
-                            print("Cycling stopped during wait")
-                            break
-                        time.sleep(1)
+                    print(f"Waiting {settings['cycle_time']} seconds before next image...")
+                    command = wait_for_next_refresh(generation, time.monotonic(), 'cycle_time')
+                    
+                    if command == 'previous':
+                        playlist.previous()
+                    elif command == 'skip':
+                        playlist.skip()
+                    if command:
+                        print(f"Cycle command: {command}")
                 else:
                     print("No images found for cycling")
-                    time.sleep(5)  # Wait before checking again
+                    wait_for_next_refresh(generation, time.monotonic(), 5)  # Wait before checking again
             else:
                 break
                 
         except Exception as e:
             print(f"Error in cycling worker: {e}")
-            time.sleep(5)  # Wait before retrying
+            wait_for_next_refresh(generation, time.monotonic(), 5)  # Wait before retrying
     
     print("Cycling worker stopped")
 
+def start_worker_thread():
+    """Start a cycling worker for a new generation; an older worker exits at its next wake-up"""
+    global cycling_thread, worker_generation, scheduler_command
+    
+    with scheduler_condition:
+        # A command sent to the old worker must not carry over to the new one
+        worker_generation += 1
+        scheduler_command = None
+    cycling_thread = threading.Thread(target=cycling_worker, args=(worker_generation,), daemon=True)
+    cycling_thread.start()
+
 def start_cycling():
     """Start the cycling thread"""
-    global cycling_thread, cycling_active, current_album_images, current_image_index
+    global cycling_active, current_playlist
     
-    if cycling_thread and cycling_thread.is_alive():
+    if cycling_active:
         print("Cycling thread already active")
         return False
     
     # Reset cycling state
-    current_album_images = []
-    current_image_index = 0
+    current_playlist = None
     cycling_active = True
     
-    cycling_thread = threading.Thread(target=cycling_worker, daemon=True)
-    cycling_thread.start()
+    start_worker_thread()
+    record_status_change()
     print("Started cycling thread")
     return True
 
 def start_ai_mode():
     """Start AI mode"""
-    global cycling_thread, ai_mode_active
+    global ai_mode_active, ai_pool_thread
     
-    if cycling_thread and cycling_thread.is_alive():
+    if ai_mode_active:
         print("Thread already active")
         return False
     
     ai_mode_active = True
-    cycling_thread = threading.Thread(target=cycling_worker, daemon=True)
-    cycling_thread.start()
+    start_worker_thread()
+    
+    # Generate ahead so each AI interval shows an image straight from the pool
+    ai_pool_thread = threading.Thread(target=ai_pool_worker, args=(worker_generation,), daemon=True)
+    ai_pool_thread.start()
+    record_status_change()
     print("Started AI mode thread")
     return True
 
 def stop_all_modes():
     """Stop cycling and AI modes"""
-    global cycling_active, ai_mode_active, current_album_images, current_image_index
+    global cycling_active, ai_mode_active, current_playlist, worker_generation, scheduler_command
     print("Stopping all modes...")
     cycling_active = False
     ai_mode_active = False
-    current_album_images = []
-    current_image_index = 0
+    with scheduler_condition:
+        # Drop any /next or /previous nobody will consume, so a later worker doesn't act on it
+        worker_generation += 1
+        scheduler_command = None
+    current_playlist = None
+    cancel_prerender()
+    wake_scheduler()
+    wake_ai_pool()
+    record_status_change()
 
-# Initialize database on startup
-init_database()
+# Initialize settings, database, status counters and frame cache on startup. The display worker
+# is not started here: the CLI and the reloader's watcher process import this file too, and only
+# the process serving requests should open the panel (submit_display_job starts it on first use).
+# Image pool workers re-import this file as __mp_main__; they only need imaging, not the app.
+if __name__ != '__mp_main__':
+    load_settings()
+    atexit.register(flush_settings)
+    init_database()
+    load_status_counters()
+    load_frame_cache_index()
 
 @app.route('/')
 def index():
@@ -420,46 +2004,42 @@ def upload_file():
     
     if file and allowed_file(file.filename):
         original_filename = file.filename
-        filename = secure_filename(file.filename)
-        
-        # Handle duplicate filenames
-        base_name, ext = os.path.splitext(filename)
-        counter = 1
-        while os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], filename)):
-            filename = f"{base_name}_{counter}{ext}"
-            counter += 1
+        ext = os.path.splitext(secure_filename(file.filename))[1]
         
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        
-        # Get album ID from request
+        # Checked before storing anything, so a bad album leaves no file behind
         album_id = request.form.get('album_id', 1, type=int)
+        if not album_exists(album_id):
+            return jsonify({'error': 'Album not found'}), 404
+        
         saturation = float(request.form.get('saturation', 0.5))
+        force = request.form.get('force', '').lower() in ('1', 'true', 'on')
         
-        # Add to database
-        file_size = os.path.getsize(filepath)
-        image_id = add_image_to_db(filename, original_filename, filepath, 
-                                 album_id=album_id, file_size=file_size, image_type='uploaded')
+        # Stored by content hash, so duplicates share one file. The file was written to the
+        # uploads folder and hashed while the form was parsed (see UploadRequest).
+        try:
+            image_id, filepath = add_spooled_image(file.stream.spooled(), app.config['UPLOAD_FOLDER'], ext,
+                                                   original_filename, album_id=album_id, image_type='uploaded')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except sqlite3.Error as e:
+            return jsonify({'error': f'Failed to save image: {e}'}), 500
+        filename = os.path.basename(filepath)
         
         # Stop any active cycling/AI mode
         stop_all_modes()
         
-        # Display on Inky
-        success = display_image_on_inky(filepath, saturation)
+        # Queue for the Inky; the refresh runs on the display worker
+        job = queue_display_image(filepath, saturation, image_id, force)
         
         # Update settings
-        settings = load_settings()
-        settings['current_mode'] = 'manual'
-        save_settings(settings)
+        update_settings({'current_mode': 'manual'})
         
-        if success:
-            return jsonify({
-                'message': 'Image uploaded and displayed successfully!',
-                'filename': filename,
-                'image_id': image_id
-            })
-        else:
-            return jsonify({'error': 'Failed to display image on device'}), 500
+        return jsonify({
+            'message': 'Image uploaded, display queued',
+            'filename': filename,
+            'image_id': image_id,
+            'job_id': job['id']
+        }), 202
     
     return jsonify({'error': 'Invalid file type'}), 400
 
@@ -468,62 +2048,120 @@ def display_from_url():
     data = request.get_json()
     url = data.get('url')
     saturation = float(data.get('saturation', 0.5))
-    album_id = data.get('album_id', 1)
+    force = bool(data.get('force', False))
     
     if not url:
         return jsonify({'error': 'No URL provided'}), 400
+    # The web UI sends the album select's value as a string
+    try:
+        album_id = int(data.get('album_id', 1))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'album_id must be an integer'}), 400
+    if not album_exists(album_id):
+        return jsonify({'error': 'Album not found'}), 404
     
     try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
+        # Checks status, Content-Type and Content-Length before any of the body is read
+        try:
+            response = http_client.open_download(url, MAX_CONTENT_LENGTH)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Create a filename from the URL
         original_filename = url.split('/')[-1]
         if not allowed_file(original_filename):
             original_filename = 'downloaded_image.jpg'
         
-        filename = secure_filename(original_filename)
-        
-        # Handle duplicate filenames
-        base_name, ext = os.path.splitext(filename)
-        counter = 1
-        while os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], filename)):
-            filename = f"{base_name}_{counter}{ext}"
-            counter += 1
-        
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        ext = os.path.splitext(secure_filename(original_filename))[1]
         
-        # Save the image
-        with open(filepath, 'wb') as f:
-            f.write(response.content)
-        
-        # Add to database
-        file_size = os.path.getsize(filepath)
-        image_id = add_image_to_db(filename, original_filename, filepath, 
-                                 album_id=album_id, file_size=file_size, image_type='downloaded')
+        # Save the image as it arrives, stored by content hash
+        try:
+            image_id, filepath = add_image_from_stream(
+                http_client.iter_download(response, INGEST_CHUNK_SIZE), app.config['UPLOAD_FOLDER'], ext,
+                original_filename, album_id=album_id, image_type='downloaded')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        finally:
+            response.close()
         
         # Stop any active cycling/AI mode
         stop_all_modes()
         
-        # Display on Inky
-        success = display_image_on_inky(filepath, saturation)
+        # Queue for the Inky; the refresh runs on the display worker
+        job = queue_display_image(filepath, saturation, image_id, force)
         
         # Update settings
-        settings = load_settings()
-        settings['current_mode'] = 'manual'
-        save_settings(settings)
+        update_settings({'current_mode': 'manual'})
         
-        if success:
-            return jsonify({
-                'message': 'Image downloaded and displayed successfully!',
-                'image_id': image_id
-            })
-        else:
-            return jsonify({'error': 'Failed to display image on device'}), 500
+        return jsonify({
+            'message': 'Image downloaded, display queued',
+            'image_id': image_id,
+            'job_id': job['id']
+        }), 202
             
     except Exception as e:
         return jsonify({'error': f'Failed to download image: {str(e)}'}), 500
 
+@app.route('/import', methods=['POST'])
+def import_upload():
+    """Add many images to an album from uploaded files and ZIP archives, without refreshing the display"""
+    files = [file for file in request.files.getlist('files') if file.filename]
+    if not files:
+        return jsonify({'error': 'No files provided'}), 400
+    
+    album_id = request.form.get('album_id', 1, type=int)
+    if not album_exists(album_id):
+        return jsonify({'error': 'Album not found'}), 404
+    prerender = request.form.get('prerender', '').lower() in ('1', 'true', 'on')
+    
+    # The files are already spooled into the uploads folder (see UploadRequest) and are only
+    # moved into temp_dir; ZIPs are checked here, extraction and the import run after this
+    # request returns
+    temp_dir = tempfile.mkdtemp(prefix='.import-', dir=UPLOAD_FOLDER)
+    sources = []
+    archives = []
+    total = 0
+    try:
+        for index, file in enumerate(files):
+            ext = os.path.splitext(secure_filename(file.filename))[1].lower()
+            if ext == '.zip':
+                zip_path = os.path.join(temp_dir, f"{index}.zip")
+                os.replace(file.stream.temp_path, zip_path)
+                with zipfile.ZipFile(zip_path) as archive:
+                    total += len(zip_image_members(archive, max_members=None))
+                archives.append((zip_path, os.path.join(temp_dir, str(index))))
+            elif allowed_file(file.filename):
+                path = os.path.join(temp_dir, f"{index}{ext}")
+                os.replace(file.stream.temp_path, path)
+                sources.append((path, file.filename))
+                total += 1
+            
+            if total > IMPORT_MAX_FILES:
+                raise ValueError(f'More than {IMPORT_MAX_FILES} images')
+    except zipfile.BadZipFile:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        return jsonify({'error': 'Invalid ZIP file'}), 400
+    except ValueError as e:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        return jsonify({'error': str(e)}), 400
+    except Exception:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    
+    if not total:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        return jsonify({'error': 'No images found'}), 400
+    
+    job = create_job('import', album_id=album_id)
+    threading.Thread(target=run_import_job, args=(job, sources, album_id, prerender, temp_dir, archives),
+                     daemon=True).start()
+    
+    return jsonify({
+        'message': f'Importing {total} images',
+        'total': total,
+        'job_id': job['id']
+    }), 202
+
 @app.route('/images/<int:image_id>/display', methods=['POST'])
 def display_image_by_id(image_id):
     """Display a specific image by ID"""
@@ -536,22 +2174,33 @@ def display_image_by_id(image_id):
     
     data = request.get_json() or {}
     saturation = float(data.get('saturation', 0.5))
+    force = bool(data.get('force', False))
     
     # Stop any active cycling/AI mode
     stop_all_modes()
     
-    # Display on Inky
-    success = display_image_on_inky(image['filepath'], saturation)
+    # Queue for the Inky; the refresh runs on the display worker
+    job = queue_display_image(image['filepath'], saturation, image_id, force)
     
     # Update settings
-    settings = load_settings()
-    settings['current_mode'] = 'manual'
-    save_settings(settings)
+    update_settings({'current_mode': 'manual'})
     
-    if success:
-        return jsonify({'message': f'Displayed: {image["filename"]}'})
-    else:
-        return jsonify({'error': 'Failed to display image on device'}), 500
+    return jsonify({
+        'message': f'Display queued: {image["filename"]}',
+        'image_id': image_id,
+        'job_id': job['id']
+    }), 202
+
+@app.route('/jobs/<int:job_id>', methods=['GET'])
+def display_job_status(job_id):
+    """Get the status of a display job"""
+    with display_jobs_condition:
+        job = display_jobs.get(job_id)
+    
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(display_job_to_dict(job))
 
 @app.route('/images/<int:image_id>', methods=['DELETE'])
 def delete_image(image_id):
@@ -595,6 +2244,10 @@ def albums():
             conn.commit()
             conn.close()
             
+            with status_condition:
+                album_names[album_id] = name
+            record_status_change()
+            
             return jsonify({
                 'message': 'Album created successfully',
                 'album_id': album_id,
@@ -626,13 +2279,18 @@ def delete_album(album_id):
     conn.commit()
     conn.close()
     
+    with status_condition:
+        album_names.pop(album_id, None)
+        moved = album_image_counts.pop(album_id, 0)
+        album_image_counts[None] = album_image_counts.get(None, 0) + moved
+    publish_image_event('album_deleted', album_id=album_id)
+    
     return jsonify({'message': 'Album deleted successfully'})
 
 @app.route('/albums/<int:album_id>/images', methods=['GET'])
 def get_album_images(album_id):
     """Get images in a specific album"""
-    images = get_images_by_album(album_id)
-    return jsonify(images)
+    return image_page_response(album_id)
 
 @app.route('/images/<int:image_id>/album', methods=['PUT'])
 def move_image_to_album(image_id):
@@ -660,29 +2318,30 @@ def move_image_to_album(image_id):
     conn.commit()
     conn.close()
     
-    # Reset cycling state if album is changed
-    global current_album_images
-    current_album_images = []
+    update_album_image_count(image['album_id'], -1)
+    update_album_image_count(new_album_id, 1)
+    
+    # Patch the running playlist rather than reloading it
+    publish_image_event('moved', image_id, new_album_id, image['album_id'])
+    cancel_prerender()
     
     return jsonify({'message': 'Image moved successfully'})
 
 @app.route('/clear', methods=['POST'])
 def clear():
+    data = request.get_json(silent=True) or {}
+    force = bool(data.get('force', False))
+    
     stop_all_modes()
-    success = clear_display()
+    job = queue_clear_display(force)
     
-    settings = load_settings()
-    settings['current_mode'] = 'manual'
-    save_settings(settings)
+    update_settings({'current_mode': 'manual'})
     
-    if success:
-        return jsonify({'message': 'Display cleared successfully!'})
-    else:
-        return jsonify({'error': 'Failed to clear display'}), 500
+    return jsonify({'message': 'Clear queued', 'job_id': job['id']}), 202
 
 @app.route('/start_cycle', methods=['POST'])
 def start_cycle():
-    global cycling_active, ai_mode_active, current_album_images
+    global cycling_active, ai_mode_active
     
     if cycling_active:
         return jsonify({'error': 'Cycling is already active'}), 400
@@ -693,23 +2352,54 @@ def start_cycle():
     
     if ai_mode_active:
         stop_all_modes()
-        time.sleep(1)  # Give time for threads to stop
     
-    # Clear current images to force reload
-    current_album_images = []
+    # Set the album first; the worker builds its playlist from it
+    update_settings({'current_album': album_id})
     
     success = start_cycling()
     
     if success:
-        settings = load_settings()
-        settings['current_mode'] = 'cycle'
-        settings['current_album'] = album_id
-        save_settings(settings)
+        update_settings({'current_mode': 'cycle'})
         print(f"Cycle mode started for album {album_id}")
         return jsonify({'message': f'Started cycling through album {album_id}'})
     else:
         return jsonify({'error': 'Failed to start cycling'}), 500
 
+@app.route('/ai/batch', methods=['POST'])
+def ai_batch():
+    """Generate a batch of AI images into an album in the background"""
+    if not openai.api_key:
+        return jsonify({'error': 'OpenAI API key not configured'}), 400
+    
+    data = request.get_json() or {}
+    settings = load_settings()
+    try:
+        prompt_count = int(data.get('prompts', settings.get('ai_batch_prompts', 1)))
+        images_per_prompt = int(data.get('images_per_prompt', settings.get('ai_images_per_prompt', 1)))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'prompts and images_per_prompt must be integers'}), 400
+    album_id = data.get('album_id')
+    if album_id is not None:
+        try:
+            album_id = int(album_id)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'album_id must be an integer'}), 400
+        if not album_exists(album_id):
+            return jsonify({'error': 'Album not found'}), 404
+    
+    def run_batch():
+        try:
+            generated = generate_ai_batch(prompt_count, images_per_prompt, album_id)
+            print(f"AI batch finished: {len(generated)} images")
+        except Exception as e:
+            print(f"AI batch failed: {e}")
+    
+    threading.Thread(target=run_batch, daemon=True).start()
+    
+    return jsonify({'message': 'AI batch generation started',
+                    'prompts': max(1, min(prompt_count, MAX_AI_BATCH_PROMPTS)),
+                    'images_per_prompt': max(1, min(images_per_prompt, MAX_AI_IMAGES_PER_PROMPT))}), 202
+
 @app.route('/start_ai', methods=['POST'])
 def start_ai():
     global cycling_active, ai_mode_active
@@ -722,96 +2412,112 @@ def start_ai():
     
     if cycling_active:
         stop_all_modes()
-        time.sleep(1)  # Give time for threads to stop
     
     success = start_ai_mode()
     
     if success:
-        settings = load_settings()
-        settings['current_mode'] = 'ai'
-        save_settings(settings)
+        update_settings({'current_mode': 'ai'})
         print("AI mode started")
         return jsonify({'message': 'Started AI image generation mode'})
     else:
         return jsonify({'error': 'Failed to start AI mode'}), 500
 
+@app.route('/next', methods=['POST'])
+@app.route('/previous', methods=['POST'])
+@app.route('/skip', methods=['POST'])
+def cycle_command():
+    """Move the cycle on now instead of waiting for the timer"""
+    command = request.path.strip('/')
+    
+    if not (cycling_active or ai_mode_active):
+        return jsonify({'error': 'No automatic mode is active'}), 400
+    if command == 'previous' and not cycling_active:
+        return jsonify({'error': 'Previous is only available while cycling'}), 400
+    
+    wake_scheduler(command)
+    return jsonify({'message': f'{command.capitalize()} requested'})
+
 @app.route('/stop_modes', methods=['POST'])
 def stop_modes():
     stop_all_modes()
     
-    settings = load_settings()
-    settings['current_mode'] = 'manual'
-    save_settings(settings)
+    update_settings({'current_mode': 'manual'})
     
     return jsonify({'message': 'Stopped all automatic modes'})
 
 @app.route('/settings', methods=['GET', 'POST'])
 def settings():
-    global current_album_images
+    global current_playlist
     
     if request.method == 'GET':
         current_settings = load_settings()
         # Add current status information
         current_settings['cycling_active'] = cycling_active
         current_settings['ai_mode_active'] = ai_mode_active
-        current_settings['current_image_index'] = current_image_index
-        current_settings['total_images'] = len(current_album_images)
+        current_settings['current_image_index'] = current_playlist.current_number() if current_playlist else 0
+        current_settings['total_images'] = len(current_playlist) if current_playlist else 0
         return jsonify(current_settings)
     
     elif request.method == 'POST':
         data = request.get_json()
-        current_settings = load_settings()
         
         # Update settings
-        for key in ['cycle_time', 'saturation', 'ai_generation_interval', 'current_album']:
-            if key in data:
-                current_settings[key] = data[key]
+        update_settings({key: data[key] for key in ['cycle_time', 'saturation', 'ai_generation_interval',
+                                                    'current_album', 'prerender_ahead', 'clear_passes',
+                                                    'clear_colours', 'display_master_size', 'cycle_order',
+                                                    'ai_pool_size', 'ai_batch_prompts', 'ai_images_per_prompt',
+                                                    'dither_preset']
+                         if key in data})
         
-        save_settings(current_settings)
+        if 'ai_pool_size' in data:
+            wake_ai_pool()
         
-        # If we're changing album while cycling, reset the image list
-        if 'current_album' in data and cycling_active:
-            current_album_images = []
+        # A different album or order needs a new playlist; anything else keeps the position
+        playlist = current_playlist
+        if playlist and (data.get('current_album', playlist.album_id) != playlist.album_id
+                         or data.get('cycle_order', playlist.order) != playlist.order):
+            current_playlist = None
+        
+        # Queued frames may be for the old album, saturation or dither preset
+        cancel_prerender()
         
         return jsonify({'message': 'Settings updated successfully'})
 
 @app.route('/status', methods=['GET'])
 def status():
-    settings = load_settings()
+    # Long-poll: with ?since=<version>, hold the request until something changes
+    since = request.args.get('since', type=int)
+    if since is not None:
+        timeout = min(request.args.get('timeout', STATUS_WAIT_TIMEOUT, type=float), STATUS_WAIT_TIMEOUT)
+        wait_for_status_change(since, timeout)
     
-    # Get current album name
-    current_album_name = "All Images"
-    if settings.get('current_album') != 1:
-        conn = get_db_connection()
-        album = conn.execute('SELECT name FROM albums WHERE id = ?', (settings['current_album'],)).fetchone()
-        if album:
-            current_album_name = album['name']
-        conn.close()
+    return jsonify(get_status_snapshot())
+
+@app.route('/events')
+def status_events():
+    """Stream status snapshots as Server-Sent Events whenever the status changes"""
+    def stream():
+        version = -1
+        while True:
+            if wait_for_status_change(version, EVENTS_HEARTBEAT):
+                snapshot = get_status_snapshot()
+                version = snapshot['version']
+                yield f"id: {version}\nevent: status\ndata: {json.dumps(snapshot)}\n\n"
+            else:
+                yield ": keep-alive\n\n"
     
-    return jsonify({
-        'cycling_active': cycling_active,
-        'ai_mode_active': ai_mode_active,
-        'settings': settings,
-        'image_count': len(get_all_images()),
-        'current_mode': settings.get('current_mode', 'manual'),
-        'current_album_name': current_album_name,
-        'current_image_index': current_image_index + 1 if current_album_images else 0,
-        'total_album_images': len(current_album_images),
-        'cycle_time': settings.get('cycle_time', 30),
-        'ai_generation_interval': settings.get('ai_generation_interval', 300),
-        'saturation': settings.get('saturation', 0.5)
-    })
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/images', methods=['GET'])
 def list_images():
     album_id = request.args.get('album_id', type=int)
-    images = get_images_by_album(album_id)
-    return jsonify(images)
+    return image_page_response(album_id)
 
 @app.route('/test', methods=['GET'])
 def test_connection():
     try:
-        inky = auto(ask_user=False, verbose=False)
+        inky = get_display()
         return jsonify({
             'message': 'Connection successful!',
             'resolution': inky.resolution,
@@ -825,9 +2531,101 @@ def test_connection():
 def uploaded_file(filename):
     return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
 
+@app.route('/thumbs/<int:image_id>/<int:size>')
+def thumbnail_file(image_id, size):
+    """Serve a cached thumbnail of an image"""
+    if size not in THUMBNAIL_SIZES:
+        return jsonify({'error': f'Thumbnail size must be one of {list(THUMBNAIL_SIZES)}'}), 400
+    
+    conn = get_db_connection()
+    image = conn.execute('SELECT filepath FROM images WHERE id = ?', (image_id,)).fetchone()
+    conn.close()
+    
+    if not image or not os.path.exists(image['filepath']):
+        return jsonify({'error': 'Image not found'}), 404
+    
+    try:
+        path = get_thumbnail(image['filepath'], size)
+    except Exception as e:
+        return jsonify({'error': f'Failed to create thumbnail: {str(e)}'}), 500
+    
+    response = send_file(os.path.abspath(path), mimetype=f'image/{THUMBNAIL_FORMAT.lower()}')
+    response.set_etag(os.path.splitext(os.path.basename(path))[0])
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = THUMBNAIL_MAX_AGE
+    return response.make_conditional(request)
+
 @app.route('/pictures/<filename>')
 def picture_file(filename):
     return send_from_directory(PICTURES_FOLDER, filename)
 
+def resolve_album(album):
+    """Find an album by id or name for the command line, creating it if the name is new"""
+    if album is None:
+        return 1
+    if str(album).isdigit():
+        if not album_exists(int(album)):
+            raise SystemExit(f"Album {album} not found")
+        return int(album)
+    
+    conn = get_db_connection()
+    row = conn.execute('SELECT id FROM albums WHERE name = ?', (album,)).fetchone()
+    if row:
+        conn.close()
+        return row['id']
+    
+    cursor = conn.execute('INSERT INTO albums (name, description) VALUES (?, ?)', (album, ''))
+    album_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+    
+    with status_condition:
+        album_names[album_id] = album
+    print(f"Created album {album} ({album_id})")
+    return album_id
+
+def import_command(args):
+    """Import a directory, image or ZIP from the command line"""
+    album_id = resolve_album(args.album)
+    
+    temp_dir = None
+    try:
+        if zipfile.is_zipfile(args.path):
+            temp_dir = tempfile.mkdtemp(prefix='.import-', dir=UPLOAD_FOLDER)
+            sources = extract_zip_sources(args.path, temp_dir, max_total=None, max_members=None)
+        else:
+            sources = collect_import_sources(args.path, args.recursive)
+        
+        if not sources:
+            print(f"No images found in {args.path}")
+            return
+        
+        print(f"Importing {len(sources)} images into album {album_id} with {IMAGE_WORKERS} workers")
+        import_images(sources, album_id, prerender=args.prerender)
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        flush_settings()
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Inky display controller")
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('serve', help="Run the web interface (default)")
+    
+    import_parser = subparsers.add_parser('import', help="Import a directory, image or ZIP of images")
+    import_parser.add_argument('path', help="Directory, image file or ZIP archive")
+    import_parser.add_argument('--album', '-a', help="Album id or name (created if it doesn't exist)")
+    import_parser.add_argument('--no-recursive', dest='recursive', action='store_false',
+                               help="Only import the top level of the directory")
+    import_parser.add_argument('--prerender', action='store_true', help="Render display frames for the new images")
+    
+    args = parser.parse_args()
+    if args.command == 'import':
+        import_command(args)
+    else:
+        debug = True
+        # With the reloader on, requests are served by its child process (WERKZEUG_RUN_MAIN set)
+        if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+            start_display_worker()
+        app.run(host='0.0.0.0', port=5000, debug=debug)
\ No newline at end of file
@@ -0,0 +1,241 @@
+"""Benchmark the display pipeline without a panel
+
+Times each stage of getting an image onto the simulated display (decode,
+resize, quantize, push) for a set of typical inputs, panel models and
+quantize methods, plus the app's own display_image_on_inky and
+clear_display. Every case runs in its own process so peak RSS is per case;
+for app cases that is the app process only: frames render in the image
+pool's workers, which are forkserver children and so never counted.
+
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --images phone dalle --methods pil ordered --json results.json
+
+Compare the JSON output between commits to catch regressions.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import statistics
+import shutil
+import subprocess
+import tempfile
+
+import numpy
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import imaging
+import quantize
+import simulated_display
+
+IMAGES = {  # name -> (size, format), generated once per run
+    'phone': ((4032, 3024), 'JPEG'),  # phone camera photo, stored rotated with an EXIF orientation
+    'dalle': ((1024, 1024), 'PNG'),  # DALL-E result
+    'huge': ((6000, 6000), 'PNG')  # very large PNG, still under imaging.MAX_DECODE_PIXELS
+}
+METHODS = list(quantize.QUANTIZE_METHODS)
+SATURATION = 0.5
+
+def make_test_image(path, size, image_format):
+    """Write a synthetic photo-like image: smooth gradients with some noise"""
+    width, height = size
+    x = numpy.linspace(0, 1, width, dtype=numpy.float32)[None, :]
+    y = numpy.linspace(0, 1, height, dtype=numpy.float32)[:, None]
+    noise = numpy.random.default_rng(0).normal(0, 12, (height, width)).astype(numpy.float32)
+    pixels = numpy.stack([
+        255 * x + 0 * y,
+        255 * y + 0 * x,
+        127 + 127 * numpy.sin(6 * x + 4 * y)
+    ], axis=-1) + noise[..., None]
+    image = Image.fromarray(numpy.clip(pixels, 0, 255).astype(numpy.uint8))
+    
+    if image_format == 'JPEG':
+        # Sensor-oriented pixels plus the orientation tag, like a portrait phone photo
+        exif = Image.Exif()
+        exif[imaging.ORIENTATION_TAG] = 6
+        image.save(path, format='JPEG', quality=90, exif=exif)
+    else:
+        image.save(path, format=image_format)
+
+def peak_rss_mb():
+    """Peak resident memory of this process, in MB"""
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def summarize(samples):
+    """Median and worst time of each stage, in milliseconds"""
+    return {stage: {'median_ms': round(statistics.median(times) * 1000, 1), 'max_ms': round(max(times) * 1000, 1)}
+            for stage, times in samples.items()}
+
+def run_pipeline_case(case):
+    """Time decode, resize, quantize and push for one image, panel and method"""
+    inky = simulated_display.SimulatedInky(case['panel'], refresh_time=case['refresh_time'])
+    palette = inky._palette_blend(SATURATION)
+    samples = {'decode': [], 'resize': [], 'quantize': [], 'push': [], 'total': []}
+    
+    for i in range(case['warmup'] + case['repeat']):
+        times = {}
+        started = time.perf_counter()
+        image = imaging.open_for_display(case['path'], inky.resolution)
+        image.load()
+        times['decode'] = time.perf_counter() - started
+        
+        mark = time.perf_counter()
+        frame = image.resize(inky.resolution, reducing_gap=imaging.RESIZE_REDUCING_GAP)
+        times['resize'] = time.perf_counter() - mark
+        
+        mark = time.perf_counter()
+        frame = quantize.quantize_image(frame, palette, case['method'])
+        times['quantize'] = time.perf_counter() - mark
+        
+        mark = time.perf_counter()
+        inky.set_image(frame, saturation=SATURATION)
+        inky.show()
+        times['push'] = time.perf_counter() - mark
+        times['total'] = time.perf_counter() - started
+        
+        if i >= case['warmup']:
+            for stage, value in times.items():
+                samples[stage].append(value)
+    
+    return samples
+
+def run_app_case(case):
+    """Time the app's display_image_on_inky (cold and cached) and clear_display on a simulated panel"""
+    # app.py keeps its database, uploads and caches relative to the working directory
+    os.chdir(case['workdir'])
+    os.environ['INKY_SIMULATE'] = case['panel']
+    os.environ['INKY_SIMULATE_REFRESH_TIME'] = str(case['refresh_time'])
+    import app
+    
+    app.update_settings({'dither_preset': case['preset']})
+    # Copied in directly: the huge image is over the upload size limit, and ingesting is not what is timed
+    filepath = shutil.copy(case['path'], app.UPLOAD_FOLDER)
+    image_id = app.add_image_to_db(os.path.basename(filepath), os.path.basename(filepath), filepath,
+                                   file_size=os.path.getsize(filepath),
+                                   content_hash=app.file_content_hash(filepath))
+    
+    samples = {'display_cold': [], 'display_cached': [], 'display_unchanged': [], 'clear': []}
+    for i in range(case['warmup'] + case['repeat']):
+        times = {}
+        app.invalidate_frame_cache(image_id)
+        
+        started = time.perf_counter()
+        app.display_image_on_inky(filepath, SATURATION, image_id, force=True)
+        times['display_cold'] = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        app.display_image_on_inky(filepath, SATURATION, image_id, force=True)
+        times['display_cached'] = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        app.display_image_on_inky(filepath, SATURATION, image_id)
+        times['display_unchanged'] = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        app.clear_display(force=True)
+        times['clear'] = time.perf_counter() - started
+        
+        if i >= case['warmup']:
+            for stage, value in times.items():
+                samples[stage].append(value)
+    
+    app.get_image_pool().shutdown(wait=True)
+    app.flush_settings()
+    return samples
+
+def run_case(case):
+    """Run one case in this process and return its result"""
+    if case['kind'] == 'app':
+        samples, end_to_end = run_app_case(case), 'display_cold'
+    else:
+        samples, end_to_end = run_pipeline_case(case), 'total'
+    
+    result = {key: case[key] for key in ('kind', 'image', 'panel', 'method', 'preset') if key in case}
+    result['stages'] = summarize(samples)
+    result['images_per_second'] = round(len(samples[end_to_end]) / sum(samples[end_to_end]), 2)
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+def run_case_subprocess(case):
+    """Run one case in a fresh interpreter, so memory and caches do not carry over"""
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--case', json.dumps(case)],
+                               capture_output=True, text=True)
+    if completed.returncode != 0:
+        errors = completed.stderr.strip().splitlines() or ['failed']
+        result = {key: case[key] for key in ('kind', 'image', 'panel', 'method', 'preset') if key in case}
+        result['error'] = errors[-1]
+        return result
+    
+    # The app prints progress; the result is the last line
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def format_result(result):
+    """One line of the report"""
+    variant = result.get('method') or result.get('preset')
+    label = f"{result['kind']:<8} {result['image']:<6} {result['panel']:<15} {variant:<10}"
+    if 'error' in result:
+        return f"{label} ERROR {result['error']}"
+    stages = ' '.join(f"{stage}={timing['median_ms']}ms" for stage, timing in result['stages'].items())
+    return f"{label} {result['images_per_second']:>7}/s {result['peak_rss_mb']:>7}MB  {stages}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the display pipeline on a simulated panel")
+    parser.add_argument('--images', nargs='+', choices=list(IMAGES), default=list(IMAGES))
+    parser.add_argument('--panels', nargs='+', choices=list(simulated_display.PANELS),
+                        default=[simulated_display.DEFAULT_PANEL])
+    parser.add_argument('--methods', nargs='+', choices=METHODS, default=METHODS)
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per case")
+    parser.add_argument('--warmup', type=int, default=1, help="untimed runs per case")
+    parser.add_argument('--refresh-time', type=float, default=0.0, help="simulated show() time in seconds")
+    parser.add_argument('--no-app', dest='app', action='store_false',
+                        help="skip the display_image_on_inky/clear_display cases")
+    parser.add_argument('--json', help="also write the results to this file")
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    parser.add_argument('--make-image', nargs=2, metavar=('NAME', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.case:
+        print(json.dumps(run_case(json.loads(args.case))))
+        return
+    if args.make_image:
+        name, path = args.make_image
+        make_test_image(path, *IMAGES[name])
+        return
+    
+    results = []
+    with tempfile.TemporaryDirectory(prefix='inky-bench-') as temp_dir:
+        paths = {}
+        for name in args.images:
+            image_format = IMAGES[name][1]
+            paths[name] = os.path.join(temp_dir, f"{name}.{image_format.lower().replace('jpeg', 'jpg')}")
+            # Linux carries peak RSS across exec, so the parent stays small and makes the inputs elsewhere
+            subprocess.run([sys.executable, os.path.abspath(__file__), '--make-image', name, paths[name]], check=True)
+        
+        common = {'repeat': args.repeat, 'warmup': args.warmup, 'refresh_time': args.refresh_time}
+        cases = [{'kind': 'pipeline', 'image': image, 'path': paths[image], 'panel': panel, 'method': method, **common}
+                 for image in args.images for panel in args.panels for method in args.methods]
+        if args.app:
+            presets = [preset for preset, method in quantize.DITHER_PRESETS.items() if method in args.methods]
+            for image in args.images:
+                for panel in args.panels:
+                    for preset in presets:
+                        workdir = tempfile.mkdtemp(dir=temp_dir)
+                        cases.append({'kind': 'app', 'image': image, 'path': paths[image], 'panel': panel,
+                                      'preset': preset, 'workdir': workdir, **common})
+        
+        for case in cases:
+            result = run_case_subprocess(case)
+            print(format_result(result), flush=True)
+            results.append(result)
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'created_at': time.time(), 'python': sys.version.split()[0], 'results': results}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,481 @@
+"""Offline load test: the app on a simulated panel under mixed HTTP traffic
+
+Starts local stand-ins for the OpenAI API and for an image host, runs the app
+in a temporary directory with the simulated display (see simulated_display),
+and drives a mix of clients against it while the cycle is running:
+
+- dashboards polling /status, plain and long-poll
+- users paging through /images and loading thumbnails
+- uploads to /upload and /import, downloads through /url
+- AI batches through /ai/batch, answered by the fake OpenAI server
+
+It reports p50/p99 latency and error rates per route, and samples thread
+count, context switches and logged database lock errors from the app
+process. Everything runs on 127.0.0.1; no network access is needed.
+
+    python benchmarks/load_test.py --duration 60
+    python benchmarks/load_test.py --dashboards 8 --browsers 8 --uploaders 4 --json load.json
+"""
+import io
+import os
+import re
+import sys
+import json
+import time
+import random
+import socket
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+from PIL import Image, ImageDraw
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ORIGIN_IMAGES = 16  # distinct images served by the fake image host
+ORIGIN_IMAGE_SIZE = (1600, 1200)
+SEED_IMAGES = 12  # images uploaded before the load starts
+APP_START_TIMEOUT = 30  # seconds to wait for the app to answer
+REQUEST_TIMEOUT = 60
+GALLERY_PAGE_SIZE = 48
+GALLERY_FIELDS = 'id,filename,original_filename,album_name,file_size,created_at'
+LOG_PATTERNS = {  # app log lines counted in the report
+    'database_locked': re.compile(r'database is locked'),
+    'errors': re.compile(r'\bError\b')
+}
+
+def make_image_bytes(seed, size=ORIGIN_IMAGE_SIZE):
+    """A distinct JPEG for each seed: a coloured background with a few shapes"""
+    rng = random.Random(seed)
+    image = Image.new('RGB', size, tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        radius = rng.randrange(40, 300)
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius),
+                     fill=tuple(rng.randrange(256) for _ in range(3)))
+    
+    data = io.BytesIO()
+    image.save(data, format='JPEG', quality=85)
+    return data.getvalue()
+
+def free_port():
+    """Ask the OS for a free local port"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+class QuietHandler(BaseHTTPRequestHandler):
+    """Request handler without per-request logging"""
+    protocol_version = 'HTTP/1.1'
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+class FakeOpenAIHandler(QuietHandler):
+    """Answers chat completions with numbered prompts and image generations with image host URLs"""
+    
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        time.sleep(self.server.latency)
+        
+        if random.random() < self.server.error_rate:
+            self.send_json(429, {'error': {'message': 'Rate limit reached', 'type': 'requests'}},
+                           {'Retry-After': '1'})
+            return
+        
+        if self.path.endswith('/chat/completions'):
+            text = ' '.join(message.get('content', '') for message in body.get('messages', []))
+            match = re.search(r'Create (\d+) different', text)
+            count = int(match.group(1)) if match else 1
+            content = '\n'.join(f"{number}. load test prompt {random.randrange(10 ** 6)}"
+                                for number in range(1, count + 1))
+            self.send_json(200, {
+                'id': 'chatcmpl-load-test',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': body.get('model', 'gpt-3.5-turbo'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                             'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+            })
+        elif self.path.endswith('/images/generations'):
+            urls = [f"{self.server.origin}/images/{random.randrange(ORIGIN_IMAGES)}.jpg"
+                    for _ in range(int(body.get('n', 1)))]
+            self.send_json(200, {'created': int(time.time()), 'data': [{'url': url} for url in urls]})
+        else:
+            self.send_json(404, {'error': {'message': f'Unknown endpoint {self.path}'}})
+
+class ImageOriginHandler(QuietHandler):
+    """Serves /images/<n>.jpg from a fixed set of generated JPEGs"""
+    
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        match = re.fullmatch(r'/images/(\d+)\.jpg', self.path)
+        if not match:
+            self.send_json(404, {'error': 'Not found'})
+            return
+        
+        data = self.server.images[int(match.group(1)) % len(self.server.images)]
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def start_server(handler, **attributes):
+    """Run a threading HTTP server on a free local port in the background"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    for name, value in attributes.items():
+        setattr(server, name, value)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+class Recorder:
+    """Collects (route, status, seconds) for every request the clients make"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}  # route -> [(status, seconds)]
+        self.recording = False
+    
+    def request(self, session, method, url, route, **kwargs):
+        """Make a request, recording it under route; returns the response or None on connection errors"""
+        kwargs.setdefault('timeout', REQUEST_TIMEOUT)
+        started = time.perf_counter()
+        try:
+            response = session.request(method, url, **kwargs)
+            status = response.status_code
+        except requests.RequestException:
+            response, status = None, 0
+        elapsed = time.perf_counter() - started
+        
+        if self.recording:
+            with self.lock:
+                self.samples.setdefault(route, []).append((status, elapsed))
+        return response
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, int(round(fraction * len(values) + 0.5)) - 1))]
+
+def summarize_routes(samples, duration):
+    """Per-route count, error rate and latency percentiles in milliseconds"""
+    routes = {}
+    for route, entries in sorted(samples.items()):
+        times = sorted(seconds for _, seconds in entries)
+        errors = sum(1 for status, _ in entries if status == 0 or status >= 500)
+        rejected = sum(1 for status, _ in entries if 400 <= status < 500)
+        routes[route] = {
+            'count': len(entries),
+            'per_second': round(len(entries) / duration, 2),
+            'errors': errors,
+            'error_rate': round(errors / len(entries), 4),
+            'rejected': rejected,
+            'p50_ms': round(percentile(times, 0.50) * 1000, 1),
+            'p99_ms': round(percentile(times, 0.99) * 1000, 1),
+            'max_ms': round(times[-1] * 1000, 1)
+        }
+    return routes
+
+def read_process_counters(pid):
+    """Thread count and context switches of a process, from /proc"""
+    counters = {}
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in ('Threads', 'voluntary_ctxt_switches', 'nonvoluntary_ctxt_switches', 'VmRSS'):
+                    counters[name] = int(value.split()[0])
+    except OSError:
+        pass
+    return counters
+
+def sample_process(pid, samples, stop, interval=0.5):
+    """Record the app's /proc counters until stop is set"""
+    while not stop.is_set():
+        counters = read_process_counters(pid)
+        if counters:
+            samples.append(counters)
+        stop.wait(interval)
+
+def count_log_lines(path):
+    """Count app log lines matching each of LOG_PATTERNS"""
+    counts = dict.fromkeys(LOG_PATTERNS, 0)
+    with open(path, errors='replace') as f:
+        for line in f:
+            for name, pattern in LOG_PATTERNS.items():
+                if pattern.search(line):
+                    counts[name] += 1
+    return counts
+
+def dashboard_client(recorder, base, stop, long_poll):
+    """Poll /status like the web UI: plain every second, or long-poll on the status version"""
+    session = requests.Session()
+    version = None
+    while not stop.is_set():
+        if long_poll and version is not None:
+            response = recorder.request(session, 'GET', f"{base}/status", '/status?since',
+                                        params={'since': version, 'timeout': 5})
+        else:
+            response = recorder.request(session, 'GET', f"{base}/status", '/status')
+        
+        if response is not None and response.ok:
+            version = response.json().get('version', version)
+        if not long_poll or version is None:
+            stop.wait(1.0)
+
+def browser_client(recorder, base, stop):
+    """Page through the gallery and load thumbnails, with a short think time"""
+    session = requests.Session()
+    while not stop.is_set():
+        recorder.request(session, 'GET', f"{base}/albums", '/albums')
+        
+        cursor = None
+        for _ in range(3):
+            params = {'limit': GALLERY_PAGE_SIZE, 'fields': GALLERY_FIELDS}
+            if cursor:
+                params['after'] = cursor
+            response = recorder.request(session, 'GET', f"{base}/images", '/images?limit', params=params)
+            if response is None or not response.ok:
+                break
+            
+            page = response.json()
+            for image in page['images'][:8]:
+                recorder.request(session, 'GET', f"{base}/thumbs/{image['id']}/160", '/thumbs/<id>/<size>')
+            cursor = page.get('next_cursor')
+            if not cursor or stop.wait(0.5):
+                break
+        
+        stop.wait(random.uniform(0.5, 1.5))
+
+def uploader_client(recorder, base, stop, images):
+    """Upload images one at a time and as small /import batches, sometimes re-displaying one"""
+    session = requests.Session()
+    while not stop.is_set():
+        data = random.choice(images)
+        if random.random() < 0.3:
+            # /upload refreshes the panel and stops the cycle, so it is the rarer case
+            response = recorder.request(session, 'POST', f"{base}/upload", '/upload',
+                                        files={'file': ('load.jpg', data, 'image/jpeg')},
+                                        data={'album_id': '1', 'saturation': '0.5'})
+            if response is not None and response.ok and random.random() < 0.5:
+                image_id = response.json()['image_id']
+                recorder.request(session, 'POST', f"{base}/images/{image_id}/display",
+                                 '/images/<id>/display', json={'saturation': 0.5})
+        else:
+            batch = [('files', (f'load-{i}.jpg', random.choice(images), 'image/jpeg')) for i in range(3)]
+            recorder.request(session, 'POST', f"{base}/import", '/import', files=batch, data={'album_id': '1'})
+        
+        stop.wait(random.uniform(1.0, 3.0))
+
+def downloader_client(recorder, base, stop, origin):
+    """Add images by URL from the fake image host"""
+    session = requests.Session()
+    while not stop.is_set():
+        url = f"{origin}/images/{random.randrange(ORIGIN_IMAGES)}.jpg"
+        recorder.request(session, 'POST', f"{base}/url", '/url', json={'url': url, 'saturation': 0.5})
+        stop.wait(random.uniform(2.0, 4.0))
+
+def ai_client(recorder, base, stop, interval):
+    """Ask for an AI batch every interval seconds"""
+    session = requests.Session()
+    while not stop.wait(interval):
+        recorder.request(session, 'POST', f"{base}/ai/batch", '/ai/batch',
+                         json={'prompts': 2, 'images_per_prompt': 2})
+
+def cycle_controller(recorder, base, stop):
+    """Keep the cycle running; uploads and displays stop it, as they do for real users"""
+    session = requests.Session()
+    while not stop.wait(2.0):
+        response = recorder.request(session, 'GET', f"{base}/status", '/status')
+        if response is not None and response.ok and not response.json().get('cycling_active'):
+            recorder.request(session, 'POST', f"{base}/start_cycle", '/start_cycle', json={'album_id': 1})
+
+def wait_for_app(base, process):
+    """Wait until the app answers /status"""
+    deadline = time.monotonic() + APP_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"App exited with code {process.returncode}")
+        try:
+            if requests.get(f"{base}/status", timeout=2).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"App did not start within {APP_START_TIMEOUT}s")
+
+def serve_app(port):
+    """Run the app with the threaded development server, in the current directory"""
+    sys.path.insert(0, ROOT)
+    import app
+    app.start_display_worker()  # as app.py's serve does without the reloader
+    app.app.run(host='127.0.0.1', port=port, threaded=True, use_reloader=False)
+
+def format_report(report):
+    """Human-readable report"""
+    lines = [f"{'route':<24} {'count':>6} {'req/s':>7} {'errors':>6} {'4xx':>5} "
+             f"{'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}"]
+    for route, stats in report['routes'].items():
+        lines.append(f"{route:<24} {stats['count']:>6} {stats['per_second']:>7} {stats['errors']:>6} "
+                     f"{stats['rejected']:>5} {stats['p50_ms']:>8} {stats['p99_ms']:>8} {stats['max_ms']:>8}")
+    
+    process = report['process']
+    lines.append('')
+    lines.append(f"app threads: max {process['max_threads']}, "
+                 f"context switches: {process['voluntary_ctxt_switches']} voluntary, "
+                 f"{process['nonvoluntary_ctxt_switches']} involuntary, "
+                 f"peak RSS sampled: {process['max_rss_mb']}MB")
+    lines.append(f"app log: {report['log']['database_locked']} 'database is locked', "
+                 f"{report['log']['errors']} error lines; panel refreshes: {report['panel_refreshes']}")
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline HTTP load test of the app on a simulated panel")
+    parser.add_argument('--duration', type=float, default=30, help="seconds of load")
+    parser.add_argument('--dashboards', type=int, default=4, help="clients polling /status (half long-poll)")
+    parser.add_argument('--browsers', type=int, default=4, help="clients paging /images and thumbnails")
+    parser.add_argument('--uploaders', type=int, default=2, help="clients uploading and importing images")
+    parser.add_argument('--downloaders', type=int, default=1, help="clients adding images by URL")
+    parser.add_argument('--ai-interval', type=float, default=10, help="seconds between /ai/batch requests, 0 for none")
+    parser.add_argument('--refresh-time', type=float, default=2.0, help="simulated panel refresh time in seconds")
+    parser.add_argument('--panel', default='impression-5.7', help="simulated panel model")
+    parser.add_argument('--api-latency', type=float, default=0.2, help="fake OpenAI response time in seconds")
+    parser.add_argument('--api-error-rate', type=float, default=0.0, help="fraction of OpenAI calls answered with 429")
+    parser.add_argument('--origin-latency', type=float, default=0.05, help="fake image host response time")
+    parser.add_argument('--keep', action='store_true', help="keep the app's temporary directory and log")
+    parser.add_argument('--json', help="also write the report to this file")
+    parser.add_argument('--serve-app', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.serve_app:
+        serve_app(args.serve_app)
+        return
+    
+    images = [make_image_bytes(seed) for seed in range(ORIGIN_IMAGES)]
+    origin_server, origin = start_server(ImageOriginHandler, images=images, latency=args.origin_latency)
+    openai_server, openai_base = start_server(FakeOpenAIHandler, origin=origin, latency=args.api_latency,
+                                              error_rate=args.api_error_rate)
+    
+    workdir = tempfile.mkdtemp(prefix='inky-load-')
+    log_path = os.path.join(workdir, 'app.log')
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(os.environ,
+               INKY_SIMULATE=args.panel,
+               INKY_SIMULATE_REFRESH_TIME=str(args.refresh_time),
+               INKY_SIMULATE_FRAMES=os.path.join(workdir, 'frames'),  # one PNG per refresh, counted at the end
+               OPENAI_API_BASE=f"{openai_base}/v1",
+               OPENAI_API_KEY='load-test',
+               PYTHONUNBUFFERED='1')
+    
+    print(f"Starting app on {base} in {workdir}")
+    with open(log_path, 'w') as log:
+        process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve-app', str(port)],
+                                   cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    
+    recorder = Recorder()
+    stop = threading.Event()
+    process_samples = []
+    try:
+        wait_for_app(base, process)
+        
+        # Some images to cycle through and browse, then the cycle running underneath the load
+        session = requests.Session()
+        for seed in range(SEED_IMAGES):
+            session.post(f"{base}/import", files=[('files', (f'seed-{seed}.jpg', images[seed % len(images)]))],
+                         data={'album_id': '1'}, timeout=REQUEST_TIMEOUT)
+        session.post(f"{base}/settings", json={'cycle_time': 5, 'saturation': 0.5}, timeout=REQUEST_TIMEOUT)
+        session.post(f"{base}/start_cycle", json={'album_id': 1}, timeout=REQUEST_TIMEOUT)
+        
+        clients = [threading.Thread(target=cycle_controller, args=(recorder, base, stop))]
+        clients += [threading.Thread(target=dashboard_client, args=(recorder, base, stop, i % 2 == 1))
+                    for i in range(args.dashboards)]
+        clients += [threading.Thread(target=browser_client, args=(recorder, base, stop))
+                    for _ in range(args.browsers)]
+        clients += [threading.Thread(target=uploader_client, args=(recorder, base, stop, images))
+                    for _ in range(args.uploaders)]
+        clients += [threading.Thread(target=downloader_client, args=(recorder, base, stop, origin))
+                    for _ in range(args.downloaders)]
+        if args.ai_interval:
+            clients.append(threading.Thread(target=ai_client, args=(recorder, base, stop, args.ai_interval)))
+        clients.append(threading.Thread(target=sample_process, args=(process.pid, process_samples, stop)))
+        
+        print(f"Running {len(clients) - 1} clients for {args.duration:g}s")
+        before = read_process_counters(process.pid)
+        recorder.recording = True
+        started = time.monotonic()
+        for client in clients:
+            client.daemon = True
+            client.start()
+        
+        stop.wait(args.duration)
+        stop.set()
+        recorder.recording = False
+        duration = time.monotonic() - started
+        after = read_process_counters(process.pid)
+        
+        status = requests.get(f"{base}/status", timeout=REQUEST_TIMEOUT).json()
+        for client in clients:
+            client.join(REQUEST_TIMEOUT)
+    finally:
+        stop.set()
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        origin_server.shutdown()
+        openai_server.shutdown()
+    
+    frames_folder = os.path.join(workdir, 'frames')
+    refreshes = len(os.listdir(frames_folder)) if os.path.isdir(frames_folder) else 0
+    report = {
+        'created_at': time.time(),
+        'duration': round(duration, 1),
+        'clients': {'dashboards': args.dashboards, 'browsers': args.browsers, 'uploaders': args.uploaders,
+                    'downloaders': args.downloaders, 'ai_interval': args.ai_interval},
+        'routes': summarize_routes(recorder.samples, duration),
+        'process': {
+            'max_threads': max((sample.get('Threads', 0) for sample in process_samples), default=0),
+            'max_rss_mb': round(max((sample.get('VmRSS', 0) for sample in process_samples), default=0) / 1024, 1),
+            'voluntary_ctxt_switches': after.get('voluntary_ctxt_switches', 0)
+                                       - before.get('voluntary_ctxt_switches', 0),
+            'nonvoluntary_ctxt_switches': after.get('nonvoluntary_ctxt_switches', 0)
+                                          - before.get('nonvoluntary_ctxt_switches', 0)
+        },
+        'log': count_log_lines(log_path),
+        'panel_refreshes': refreshes,
+        'image_count': status.get('image_count')
+    }
+    
+    print(format_report(report))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    
+    if args.keep:
+        print(f"App directory and log kept in {workdir}")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
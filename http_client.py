@@ -0,0 +1,181 @@
+"""Shared HTTP session for outbound fetches (image URLs, DALL-E results)
+
+One pooled requests.Session with keep-alive, retries with backoff and
+connect/read timeouts, plus helpers that stream a download in chunks and
+give up on bodies that are too large, too slow or not an image.
+"""
+import os
+import time
+import socket
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+
+CONNECT_TIMEOUT = 5  # seconds to establish a connection
+READ_TIMEOUT = 30  # seconds to wait for each read from the socket
+DOWNLOAD_DEADLINE = 120  # seconds a whole download may take, however fast each read is
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+POOL_CONNECTIONS = 4  # hosts kept in the pool
+POOL_MAXSIZE = 8  # connections kept per host
+RETRIES = 3
+RETRY_BACKOFF = 0.5  # waits 0.5s, 1s, 2s between retries
+RETRY_AFTER_MAX = 10  # longest Retry-After honoured, in seconds
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+IMAGE_CONTENT_TYPES = ('image/', 'application/octet-stream', 'binary/octet-stream')
+
+class DownloadError(ValueError):
+    """The response is not something we will download: wrong type, too large or too slow"""
+
+# Monotonic time by which the current thread's download must finish, if any
+download_deadline = threading.local()
+
+class DeadlineRetry(Retry):
+    """Retry with Retry-After capped at RETRY_AFTER_MAX, never waiting past the thread's download deadline"""
+    
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, RETRY_AFTER_MAX)
+    
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        
+        deadline = getattr(download_deadline, 'value', None)
+        if deadline is not None:
+            wait = retry.get_retry_after(response) if response is not None and self.respect_retry_after_header else None
+            if wait is None:
+                wait = retry.get_backoff_time()
+            if time.monotonic() + wait >= deadline:
+                # Same as running out of retries: the last response is returned, or the error raised
+                raise MaxRetryError(_pool, url, error or ResponseError('download deadline reached'))
+        return retry
+
+def create_session():
+    """Create a session with connection pooling and retries for idempotent requests"""
+    retry = DeadlineRetry(
+        total=RETRIES,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+    
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+session = create_session()
+
+def get(url, **kwargs):
+    """GET through the shared session, with the default timeouts unless given"""
+    kwargs.setdefault('timeout', (CONNECT_TIMEOUT, READ_TIMEOUT))
+    return session.get(url, **kwargs)
+
+def open_download(url, max_bytes=None, content_types=IMAGE_CONTENT_TYPES, deadline=DOWNLOAD_DEADLINE):
+    """Start a streaming GET and check status, type and length before reading the body
+    
+    Raises requests.HTTPError for error statuses and DownloadError for a
+    Content-Type outside content_types or a Content-Length over max_bytes.
+    Retries count towards deadline, which iter_download enforces for the body.
+    """
+    started = time.monotonic()
+    download_deadline.value = started + deadline
+    try:
+        response = get(url, stream=True, timeout=(min(CONNECT_TIMEOUT, deadline), min(READ_TIMEOUT, deadline)))
+    finally:
+        download_deadline.value = None
+    response.download_deadline = started + deadline
+    
+    try:
+        response.raise_for_status()
+        
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_types and not content_type.startswith(tuple(content_types)):
+            raise DownloadError(f'URL is not an image (Content-Type: {content_type or "missing"})')
+        
+        content_length = int(response.headers.get('Content-Length') or 0)
+        if max_bytes and content_length > max_bytes:
+            raise DownloadError(f'Image is larger than {max_bytes // (1024 * 1024)}MB')
+    except Exception:
+        response.close()
+        raise
+    
+    return response
+
+def response_socket(response):
+    """Find the socket a streaming response reads from, or None"""
+    sock = getattr(getattr(response.raw, '_connection', None), 'sock', None)
+    if sock is None:
+        # http.client drops the connection's reference once the response owns the socket
+        reader = getattr(getattr(response.raw, '_fp', None), 'fp', None)
+        sock = getattr(getattr(reader, 'raw', None), '_sock', None)
+    return sock
+
+def abort_download(response, timed_out):
+    """Mark a download as timed out and shut down its socket, so a blocked read returns at once"""
+    timed_out.set()
+    sock = response_socket(response)
+    try:
+        if sock is not None:
+            sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+def iter_download(response, chunk_size=DOWNLOAD_CHUNK_SIZE, deadline=DOWNLOAD_DEADLINE):
+    """Yield the response body in chunks, closing it when done and giving up at the deadline
+    
+    The deadline is counted from open_download, retries included. Each read can
+    block until its chunk fills, so a watchdog cuts the connection when the
+    deadline passes rather than waiting on a server that drip-feeds bytes.
+    """
+    expires = getattr(response, 'download_deadline', time.monotonic() + deadline)
+    timed_out = threading.Event()
+    watchdog = threading.Timer(max(0, expires - time.monotonic()), abort_download, (response, timed_out))
+    watchdog.daemon = True
+    watchdog.start()
+    
+    try:
+        try:
+            for chunk in response.iter_content(chunk_size):
+                if timed_out.is_set():
+                    break
+                yield chunk
+        except requests.RequestException:
+            if not timed_out.is_set():
+                raise
+        # A cut connection can look like the end of the body, so this check comes after the loop too
+        if timed_out.is_set():
+            raise DownloadError(f'Download took longer than {deadline}s')
+    finally:
+        watchdog.cancel()
+        response.close()
+
+def download_to_file(url, path, max_bytes, content_types=IMAGE_CONTENT_TYPES):
+    """Stream url into path, never holding more than one chunk in memory; returns the size
+    
+    The body goes to a temporary file first, so path only appears once the
+    download is complete.
+    """
+    response = open_download(url, max_bytes, content_types)
+    temp_path = f"{path}.{threading.get_ident()}.part"
+    size = 0
+    
+    try:
+        with open(temp_path, 'wb') as f:
+            for chunk in iter_download(response):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise DownloadError(f'Image is larger than {max_bytes // (1024 * 1024)}MB')
+                f.write(chunk)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    
+    return size
@@ -0,0 +1,239 @@
+"""Image processing that does not touch the app's globals, database or display
+
+Everything here works on file paths and plain values only, so it can run in
+worker processes without importing app.py (which opens the database and
+detects the panel on import).
+"""
+import io
+import os
+import time
+import hashlib
+import threading
+
+from PIL import Image, ImageOps
+
+import quantize
+
+HASH_CHUNK_SIZE = 1024 * 1024
+MAX_DECODE_PIXELS = 50 * 1000 * 1000  # largest image decoded for display (~150MB as RGB)
+RESIZE_REDUCING_GAP = 2.0  # shrink by whole factors first, then resample the last step
+ORIENTATION_TAG = 0x0112
+
+def temp_path_for(path):
+    """Unique temporary path next to path, safe across threads and processes"""
+    return f"{path}.{os.getpid()}-{threading.get_ident()}-{time.time_ns()}.tmp"
+
+def hash_file(path):
+    """Get the SHA-256 of a file"""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def read_file_chunks(path, chunk_size=64 * 1024):
+    """Yield a file's contents in chunks"""
+    with open(path, 'rb') as f:
+        yield from iter(lambda: f.read(chunk_size), b'')
+
+def save_display_master(source_path, filepath, image_format, master_size):
+    """Save a copy of an image downscaled so its longest edge is master_size"""
+    with Image.open(source_path) as image:
+        image.draft('RGB', (master_size, master_size))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((master_size, master_size))
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.save(filepath, format=image_format, quality=90)
+
+def spool_path(folder):
+    """Unique path for a partly received file in folder, safe across threads and processes"""
+    return os.path.join(folder, f".ingest-{os.getpid()}-{threading.get_ident()}-{time.time_ns()}.part")
+
+class SpooledUpload(io.FileIO):
+    """Temporary file in folder that hashes everything written to it (unless hashed is False)
+    
+    Meant as the file stream while a request body is parsed, so an upload is
+    written and hashed once, as it arrives. The file is removed on close unless
+    it has been moved away (e.g. by store_spooled) by then.
+    """
+    def __init__(self, folder, hashed=True):
+        self.temp_path = spool_path(folder)
+        self.sha = hashlib.sha256() if hashed else None
+        self.size = 0
+        super().__init__(self.temp_path, 'w+b')
+    
+    def write(self, data):
+        written = super().write(data)
+        if self.sha:
+            self.sha.update(memoryview(data)[:written])
+        self.size += written
+        return written
+    
+    def spooled(self):
+        """(temp_path, size, content_hash), as returned by spool_chunks"""
+        return self.temp_path, self.size, self.sha.hexdigest()
+    
+    def close(self):
+        super().close()
+        try:
+            os.remove(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+def spool_chunks(chunks, folder, max_bytes):
+    """Write incoming chunks to a temporary file in folder, hashing them on the way
+    
+    Returns (temp_path, size, content_hash); raises ValueError past max_bytes.
+    """
+    sha = hashlib.sha256()
+    size = 0
+    temp_path = spool_path(folder)
+    
+    try:
+        with open(temp_path, 'wb') as f:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(f'Image is larger than {max_bytes // (1024 * 1024)}MB')
+                sha.update(chunk)
+                f.write(chunk)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    
+    return temp_path, size, sha.hexdigest()
+
+def store_spooled(temp_path, filepath, master_size=0):
+    """Validate a spooled image and move it to filepath, downscaled if a master size is set
+    
+    Returns the stored size; raises ValueError if it is not an image. The
+    temporary file is gone afterwards either way.
+    """
+    try:
+        # Image.open only parses the header; verify checks the rest without decoding pixels
+        try:
+            with Image.open(temp_path) as image:
+                image_format = image.format
+                image_size = image.size
+                is_animated = getattr(image, 'is_animated', False)
+                image.verify()
+        except Exception as e:
+            # The details name the temporary file, so they only go to the log
+            print(f"Rejected {temp_path}: {e}")
+            raise ValueError('File is not a valid image')
+        
+        # JPEGs can be decoded at a reduced scale; anything else this big can never be displayed
+        if image_format != 'JPEG' and image_size[0] * image_size[1] > MAX_DECODE_PIXELS:
+            raise ValueError(f'Image is too large to display ({image_size[0]}x{image_size[1]})')
+        
+        if master_size and max(image_size) > master_size and not is_animated:
+            # Still addressed by the original's hash so re-uploads of it deduplicate
+            save_display_master(temp_path, filepath, image_format, master_size)
+            os.remove(temp_path)
+            return os.path.getsize(filepath)
+        
+        os.replace(temp_path, filepath)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    
+    return os.path.getsize(filepath)
+
+def ingest_chunks(chunks, folder, ext, max_bytes, master_size=0):
+    """Write an image to disk chunk by chunk, hashing and validating it on the way
+    
+    Images are stored content-addressed as <sha256><ext> inside folder, so the same
+    image arriving twice is stored once. Returns (filepath, file_size, content_hash).
+    Raises ValueError if the stream is too large or is not an image.
+    """
+    temp_path, size, content_hash = spool_chunks(chunks, folder, max_bytes)
+    filepath = os.path.join(folder, content_hash + ext.lower())
+    if os.path.exists(filepath):
+        # Already stored; the caller only adds a new reference row
+        os.remove(temp_path)
+        return filepath, os.path.getsize(filepath), content_hash
+    
+    return filepath, store_spooled(temp_path, filepath, master_size), content_hash
+
+def open_for_display(image_path, size):
+    """Decode an image upright at the smallest scale that still covers size
+    
+    JPEGs are DCT-scaled while decoding (Image.draft), so a 24 megapixel photo is
+    decoded at 1/4 or 1/8 scale for a 600x448 panel. Raises ValueError if the
+    image would still decode to more than MAX_DECODE_PIXELS.
+    """
+    image = Image.open(image_path)
+    
+    width, height = size
+    if image.getexif().get(ORIENTATION_TAG, 1) in (5, 6, 7, 8):
+        width, height = height, width  # Rotated by a quarter turn after decoding
+    image.draft('RGB', (width, height))
+    
+    if image.width * image.height > MAX_DECODE_PIXELS:
+        raise ValueError(f'Image is too large to display ({image.width}x{image.height})')
+    
+    return ImageOps.exif_transpose(image)
+
+def render_display_frame(image_path, resolution, palette=None, method='pil'):
+    """Resize an image to the panel resolution and map it onto the panel palette"""
+    image = open_for_display(image_path, resolution)
+    frame = image.resize(resolution, reducing_gap=RESIZE_REDUCING_GAP)
+    
+    if palette:
+        # A 'P' image of palette indices, which the driver can use as-is
+        frame = quantize.quantize_image(frame, palette, method)
+    
+    return frame
+
+def frame_cache_key(image_id, content_hash, resolution, saturation, method='pil'):
+    """Build the cache filename for a display frame"""
+    width, height = resolution
+    return f"{image_id or 0}_{content_hash[:16]}_{width}x{height}_{float(saturation):.2f}_{method}.png"
+
+def save_frame(frame, path):
+    """Write a frame atomically; returns its size in bytes"""
+    temp_path = temp_path_for(path)
+    frame.save(temp_path, format='PNG')
+    os.replace(temp_path, path)
+    return os.path.getsize(path)
+
+def render_frame_file(image_path, resolution, palette, path, method='pil'):
+    """Render a display frame straight to a file; returns its size in bytes"""
+    return save_frame(render_display_frame(image_path, resolution, palette, method), path)
+
+def thumbnail_filename(content_hash, size, image_format):
+    """Build the cache filename for a thumbnail"""
+    return f"{content_hash[:16]}_{size}.{image_format.lower()}"
+
+def make_thumbnail(image_path, path, size, image_format):
+    """Write a thumbnail of image_path with its longest edge at most size"""
+    image = open_for_display(image_path, (size, size))
+    image.thumbnail((size, size))
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    
+    temp_path = temp_path_for(path)
+    image.save(temp_path, format=image_format, quality=80)
+    os.replace(temp_path, path)
+    return path
+
+def import_image(source_path, folder, ext, max_bytes, master_size, thumbnail_folder, thumbnail_size,
+                 thumbnail_format):
+    """Store one file of a bulk import and make its gallery thumbnail
+    
+    Returns {'filepath', 'file_size', 'content_hash'}; raises ValueError for files
+    that are too large or not images.
+    """
+    filepath, file_size, content_hash = ingest_chunks(read_file_chunks(source_path), folder, ext, max_bytes,
+                                                      master_size)
+    
+    thumbnail_path = os.path.join(thumbnail_folder, thumbnail_filename(content_hash, thumbnail_size, thumbnail_format))
+    if not os.path.exists(thumbnail_path):
+        make_thumbnail(filepath, thumbnail_path, thumbnail_size, thumbnail_format)
+    
+    return {'filepath': filepath, 'file_size': file_size, 'content_hash': content_hash}
@@ -0,0 +1,73 @@
+"""Palette quantization for the e-ink panel
+
+Each method maps an RGB image onto the panel palette and returns a 'P' image
+whose pixel values are palette indices, which the Inky driver uses as-is. The
+colour matching itself is always Pillow's; the methods differ in dithering.
+"""
+import numpy
+
+from PIL import Image
+
+BAYER_SIZE = 8  # ordered dither threshold map is BAYER_SIZE x BAYER_SIZE
+ORDERED_STRENGTH = 48  # spread of the ordered dither threshold, in RGB levels
+
+# Quantize method for each dither preset; times are for a 600x448 frame on a desktop CPU,
+# expect roughly 10x on a Raspberry Pi
+DITHER_PRESETS = {
+    'fast': 'nearest',  # no dithering, ~3 ms; flat areas band
+    'balanced': 'ordered',  # Bayer pattern, ~5 ms; stable between similar frames
+    'quality': 'pil'  # Floyd-Steinberg, ~6 ms; same conversion as inky.set_image
+}
+DEFAULT_DITHER_PRESET = 'quality'
+
+def palette_image(palette, padding=(0, 0, 0)):
+    """A 'P' image carrying a flat [r, g, b, ...] palette, for Image.quantize
+    
+    The unused entries are filled with padding; black is what inky.set_image uses.
+    """
+    image = Image.new('P', (1, 1))
+    image.putpalette(palette + list(padding) * (256 - len(palette) // 3))
+    return image
+
+def bayer_matrix(size):
+    """Ordered dither thresholds in (0, 1) for a size x size tile (size a power of two)"""
+    matrix = numpy.zeros((1, 1), dtype=numpy.float32)
+    while matrix.shape[0] < size:
+        matrix = numpy.block([[4 * matrix, 4 * matrix + 2], [4 * matrix + 3, 4 * matrix + 1]])
+    return (matrix + 0.5) / matrix.size
+
+def ordered_offsets(height, width, strength=ORDERED_STRENGTH):
+    """Tiled Bayer threshold offsets for a height x width image, as int16 RGB levels"""
+    tile = numpy.rint((bayer_matrix(BAYER_SIZE) - 0.5) * strength).astype(numpy.int16)
+    reps = (-(-height // BAYER_SIZE), -(-width // BAYER_SIZE))
+    return numpy.tile(tile, reps)[:height, :width, None]
+
+def quantize_nearest(image, palette):
+    """Plain nearest colour, no dithering: fastest, but flat areas band"""
+    # Padding with a real colour keeps dark pixels off the unused black entries
+    return image.quantize(palette=palette_image(palette, palette[:3]), dither=Image.Dither.NONE)
+
+def quantize_ordered(image, palette, strength=ORDERED_STRENGTH):
+    """Ordered (Bayer) dithering: a tiled threshold offset, then nearest colour"""
+    pixels = numpy.asarray(image, dtype=numpy.int16) + ordered_offsets(image.height, image.width, strength)
+    offset = Image.fromarray(numpy.clip(pixels, 0, 255).astype(numpy.uint8))
+    return quantize_nearest(offset, palette)
+
+def quantize_diffused(image, palette):
+    """Floyd-Steinberg error diffusion, Pillow's default"""
+    return image.quantize(palette=palette_image(palette), dither=Image.Dither.FLOYDSTEINBERG)
+
+QUANTIZE_METHODS = {
+    'nearest': quantize_nearest,
+    'ordered': quantize_ordered,
+    'pil': quantize_diffused
+}
+
+def quantize_image(image, palette, method='pil'):
+    """Map an image onto a flat [r, g, b, ...] palette with the given method
+    
+    'pil' is the same conversion inky.set_image does; unknown methods fall back to it.
+    """
+    frame = QUANTIZE_METHODS.get(method, quantize_diffused)(image.convert('RGB'), palette)
+    frame.putpalette(palette)
+    return frame
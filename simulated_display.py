@@ -0,0 +1,125 @@
+"""Stand-in for an Inky Impression panel, for running without hardware
+
+SimulatedInky has the parts of the inky driver interface the app uses
+(resolution, colour constants, buf, _palette_blend, set_image, show), holds
+show() for a configurable refresh time and can save every refresh as a PNG.
+"""
+import os
+import time
+import threading
+
+import numpy
+from PIL import Image
+
+BLACK = 0
+WHITE = 1
+GREEN = 2
+BLUE = 3
+RED = 4
+YELLOW = 5
+ORANGE = 6
+CLEAN = 7
+
+# Colours of the 7-colour panels as measured, and the ideal colours they are blended towards
+SATURATED_PALETTE = [
+    [57, 48, 57],
+    [255, 255, 255],
+    [58, 91, 70],
+    [61, 59, 94],
+    [156, 72, 75],
+    [208, 190, 71],
+    [177, 106, 73],
+    [255, 255, 255]
+]
+DESATURATED_PALETTE = [
+    [0, 0, 0],
+    [255, 255, 255],
+    [0, 255, 0],
+    [0, 0, 255],
+    [255, 0, 0],
+    [255, 255, 0],
+    [255, 140, 0],
+    [255, 255, 255]
+]
+
+PANELS = {  # model -> (resolution, typical full refresh time in seconds)
+    'impression-4': ((640, 400), 30.0),
+    'impression-5.7': ((600, 448), 30.0),
+    'impression-7.3': ((800, 480), 35.0)
+}
+DEFAULT_PANEL = 'impression-5.7'
+
+class SimulatedInky:
+    """A 7-colour Inky Impression that refreshes into memory (and optionally PNG files)"""
+    BLACK = BLACK
+    WHITE = WHITE
+    GREEN = GREEN
+    BLUE = BLUE
+    RED = RED
+    YELLOW = YELLOW
+    ORANGE = ORANGE
+    CLEAN = CLEAN
+    
+    colour = 'multi'
+    
+    def __init__(self, panel=DEFAULT_PANEL, refresh_time=None, frames_folder=None):
+        if panel not in PANELS:
+            raise ValueError(f"Unknown panel '{panel}', expected one of {', '.join(PANELS)}")
+        
+        self.panel = panel
+        self.resolution, default_refresh_time = PANELS[panel]
+        self.width, self.height = self.resolution
+        self.cols, self.rows = self.resolution
+        self.refresh_time = default_refresh_time if refresh_time is None else refresh_time
+        self.frames_folder = frames_folder
+        self.border_colour = WHITE
+        self.saturation = 0.5
+        self.buf = numpy.zeros((self.rows, self.cols), dtype=numpy.uint8)
+        self.refresh_count = 0
+        self.lock = threading.Lock()  # a real panel can only do one refresh at a time
+        
+        if frames_folder:
+            os.makedirs(frames_folder, exist_ok=True)
+    
+    def _palette_blend(self, saturation, dtype='uint8'):
+        """Blend the measured and ideal palettes, as the inky driver does"""
+        saturation = float(saturation)
+        palette = []
+        for saturated, desaturated in zip(SATURATED_PALETTE[:7], DESATURATED_PALETTE[:7]):
+            palette += [int(s * saturation + d * (1.0 - saturation)) for s, d in zip(saturated, desaturated)]
+        return palette + [255, 255, 255]
+    
+    def set_border(self, colour):
+        self.border_colour = colour
+    
+    def set_pixel(self, x, y, colour):
+        self.buf[y][x] = colour
+    
+    def set_image(self, image, saturation=0.5):
+        """Copy an image into the buffer; 'P' images are taken as palette indices"""
+        if image.size != self.resolution:
+            raise ValueError(f"Image is {image.size[0]}x{image.size[1]}, panel is {self.width}x{self.height}")
+        
+        if image.mode != 'P':
+            palette_image = Image.new('P', (1, 1))
+            palette_image.putpalette(self._palette_blend(saturation) + [0, 0, 0] * 248)
+            image = image.convert('RGB').quantize(palette=palette_image)
+        
+        self.saturation = saturation
+        self.buf = numpy.asarray(image, dtype=numpy.uint8).reshape((self.rows, self.cols)).copy()
+    
+    def show(self):
+        """Block for the refresh time, then save the frame if a frames folder is set"""
+        with self.lock:
+            started = time.monotonic()
+            self.refresh_count += 1
+            
+            if self.frames_folder:
+                # What the panel would show: indices through the physical colours
+                frame = Image.frombytes('P', self.resolution, self.buf.tobytes())
+                frame.putpalette(self._palette_blend(self.saturation))
+                frame.save(os.path.join(self.frames_folder, f"frame-{self.refresh_count:05d}.png"))
+            
+            remaining = self.refresh_time - (time.monotonic() - started)
+            if remaining > 0:
+                time.sleep(remaining)
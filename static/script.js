@@ -14,8 +14,8 @@ document.addEventListener('DOMContentLoaded', function() {
     updateStatusBar();
     testConnection();
     
-    // Auto-refresh status every 5 seconds for better responsiveness
-    setInterval(updateStatusBar, 5000);
+    // Push status updates from the server, falling back to polling
+    subscribeToStatus();
     
     // Close context menu on outside click
     document.addEventListener('click', function(e) {
@@ -67,6 +67,46 @@ function showStatus(message, type) {
     }
 }
 
+// Poll a display job until the panel refresh has finished
+function waitForDisplayJob(jobId, onProgress = null) {
+    return new Promise((resolve, reject) => {
+        const poll = () => {
+            fetch(`/jobs/${jobId}`)
+                .then(response => response.json())
+                .then(job => {
+                    if (job.error && !job.status) {
+                        reject(new Error(job.error));
+                    } else if (['done', 'failed', 'superseded'].includes(job.status)) {
+                        resolve(job);
+                    } else {
+                        if (onProgress && job.progress) onProgress(job.progress);
+                        setTimeout(poll, 2000);
+                    }
+                })
+                .catch(reject);
+        };
+        poll();
+    });
+}
+
+// Show the outcome of a display job in the status area
+function showDisplayJobResult(jobId, successMessage) {
+    return waitForDisplayJob(jobId)
+        .then(job => {
+            if (job.status === 'done' && job.skipped) {
+                showStatus('Display already up to date, refresh skipped', 'success');
+            } else if (job.status === 'done') {
+                showStatus(`${successMessage} (${job.timings.total}s)`, 'success');
+            } else if (job.status === 'superseded') {
+                showStatus('Replaced by a newer display request', 'success');
+            } else {
+                showStatus(job.error || 'Failed to display image on device', 'error');
+            }
+            updateStatusBar();
+        })
+        .catch(error => showStatus('Error checking display: ' + error.message, 'error'));
+}
+
 // Format file size
 function formatFileSize(bytes) {
     if (bytes === 0) return '0 Bytes';
@@ -96,7 +136,7 @@ function loadAlbums() {
 
 // Populate album select elements
 function populateAlbumSelects() {
-    const selects = ['uploadAlbumSelect', 'urlAlbumSelect', 'cycleAlbumSelect', 'galleryAlbumSelect', 'moveToAlbumSelect'];
+    const selects = ['uploadAlbumSelect', 'urlAlbumSelect', 'importAlbumSelect', 'cycleAlbumSelect', 'galleryAlbumSelect', 'moveToAlbumSelect'];
     
     selects.forEach(selectId => {
         const select = document.getElementById(selectId);
@@ -210,51 +250,75 @@ function deleteAlbum(albumId) {
     });
 }
 
+// Receive status changes as they happen instead of polling
+function subscribeToStatus() {
+    if (!window.EventSource) {
+        setInterval(updateStatusBar, 5000);
+        return;
+    }
+    
+    const events = new EventSource('/events');
+    events.addEventListener('status', function(e) {
+        renderStatusBar(JSON.parse(e.data));
+    });
+}
+
 // Update status bar with current mode and image count
 function updateStatusBar() {
     fetch('/status')
         .then(response => response.json())
-        .then(data => {
-            const indicator = document.getElementById('modeIndicator');
-            const text = document.getElementById('modeText');
-            const imageCount = document.getElementById('imageCount');
-            
-            imageCount.textContent = data.image_count;
-            
-            // Update status based on current mode
-            if (data.cycling_active) {
-                indicator.className = 'status-indicator status-active';
-                const albumInfo = data.current_album_name || 'All Images';
-                const progressInfo = data.total_album_images > 0 ?
-                    ` (${data.current_image_index}/${data.total_album_images})` : '';
-                text.innerHTML = `Cycling Mode: ${albumInfo}${progressInfo}<br>
-                    <small>${data.cycle_time}s intervals • ${data.saturation} saturation</small>`;
-            } else if (data.ai_mode_active) {
-                indicator.className = 'status-indicator status-active';
-                text.innerHTML = `AI Generation Mode Active<br>
-                    <small>${Math.floor(data.ai_generation_interval/60)}min intervals • ${data.saturation} saturation</small>`;
-            } else {
-                indicator.className = 'status-indicator status-inactive';
-                text.innerHTML = `Manual Mode<br>
-                    <small>${data.saturation} saturation</small>`;
-            }
-            
-            // Update button states
-            const startCycleBtn = document.getElementById('startCycleBtn');
-            const startAiBtn = document.getElementById('startAiBtn');
-            const stopModesBtn = document.getElementById('stopModesBtn');
-            
-            if (startCycleBtn) startCycleBtn.disabled = data.cycling_active;
-            if (startAiBtn) startAiBtn.disabled = data.ai_mode_active;
-            if (stopModesBtn) stopModesBtn.disabled = !data.cycling_active && !data.ai_mode_active;
-            
-            // Update settings display
-            currentSettings = data.settings;
-            updateSettingsDisplay(data);
-        })
+        .then(renderStatusBar)
         .catch(error => console.error('Error updating status:', error));
 }
 
+// Render a status snapshot into the status bar
+function renderStatusBar(data) {
+    const indicator = document.getElementById('modeIndicator');
+    const text = document.getElementById('modeText');
+    const imageCount = document.getElementById('imageCount');
+    
+    imageCount.textContent = data.image_count;
+    
+    // Update status based on current mode
+    if (data.cycling_active) {
+        indicator.className = 'status-indicator status-active';
+        const albumInfo = data.current_album_name || 'All Images';
+        const progressInfo = data.total_album_images > 0 ?
+            ` (${data.current_image_index}/${data.total_album_images})` : '';
+        text.innerHTML = `Cycling Mode: ${albumInfo}${progressInfo}<br>
+            <small>${data.cycle_time}s intervals • ${data.saturation} saturation</small>`;
+    } else if (data.ai_mode_active) {
+        indicator.className = 'status-indicator status-active';
+        text.innerHTML = `AI Generation Mode Active<br>
+            <small>${Math.floor(data.ai_generation_interval/60)}min intervals • ${data.saturation} saturation</small>`;
+    } else {
+        indicator.className = 'status-indicator status-inactive';
+        text.innerHTML = `Manual Mode<br>
+            <small>${data.saturation} saturation</small>`;
+    }
+    
+    // Update button states
+    const startCycleBtn = document.getElementById('startCycleBtn');
+    const startAiBtn = document.getElementById('startAiBtn');
+    const stopModesBtn = document.getElementById('stopModesBtn');
+    
+    if (startCycleBtn) startCycleBtn.disabled = data.cycling_active;
+    if (startAiBtn) startAiBtn.disabled = data.ai_mode_active;
+    if (stopModesBtn) stopModesBtn.disabled = !data.cycling_active && !data.ai_mode_active;
+    
+    const previousBtn = document.getElementById('previousBtn');
+    const nextBtn = document.getElementById('nextBtn');
+    const skipBtn = document.getElementById('skipBtn');
+    
+    if (previousBtn) previousBtn.disabled = !data.cycling_active;
+    if (nextBtn) nextBtn.disabled = !data.cycling_active && !data.ai_mode_active;
+    if (skipBtn) skipBtn.disabled = !data.cycling_active && !data.ai_mode_active;
+    
+    // Update settings display
+    currentSettings = data.settings;
+    updateSettingsDisplay(data);
+}
+
 // Update settings display with current values
 function updateSettingsDisplay(statusData) {
     const cycleTime = document.getElementById('cycleTime');
@@ -262,6 +326,8 @@ function updateSettingsDisplay(statusData) {
     const globalSaturation = document.getElementById('globalSaturation');
     const globalSaturationValue = document.getElementById('globalSaturationValue');
     const cycleAlbumSelect = document.getElementById('cycleAlbumSelect');
+    const cycleOrder = document.getElementById('cycleOrder');
+    const ditherPreset = document.getElementById('ditherPreset');
     
     if (cycleTime) cycleTime.value = statusData.cycle_time || 30;
     if (aiInterval) aiInterval.value = statusData.ai_generation_interval || 300;
@@ -270,6 +336,12 @@ function updateSettingsDisplay(statusData) {
     if (cycleAlbumSelect && statusData.settings && statusData.settings.current_album) {
         cycleAlbumSelect.value = statusData.settings.current_album;
     }
+    if (cycleOrder && statusData.settings && statusData.settings.cycle_order) {
+        cycleOrder.value = statusData.settings.cycle_order;
+    }
+    if (ditherPreset && statusData.settings && statusData.settings.dither_preset) {
+        ditherPreset.value = statusData.settings.dither_preset;
+    }
 }
 
 // Load application settings
@@ -288,84 +360,144 @@ function loadSettings() {
         .catch(error => console.error('Error loading settings:', error));
 }
 
+// Gallery paging state: pages are fetched as the sentinel scrolls into view
+const GALLERY_PAGE_SIZE = 48;
+const GALLERY_FIELDS = 'id,filename,original_filename,album_name,file_size,created_at';
+let galleryCursor = null;
+let galleryLoading = false;
+let galleryRequest = 0;
+let galleryObserver = null;
+
 // Load and display image gallery
 function loadImageGallery() {
+    const gallery = document.getElementById('imageGallery');
+    if (!gallery) return;
+    
+    // Start over from the first page; responses for an older request are ignored
+    galleryRequest++;
+    galleryCursor = null;
+    galleryLoading = false;
+    gallery.innerHTML = '';
+    
+    if (galleryObserver) {
+        galleryObserver.disconnect();
+    } else if ('IntersectionObserver' in window) {
+        galleryObserver = new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                loadGalleryPage();
+            }
+        }, { rootMargin: '400px' });
+    }
+    
+    loadGalleryPage(true);
+}
+
+// Fetch the next page of the gallery and append it
+function loadGalleryPage(firstPage = false) {
+    const gallery = document.getElementById('imageGallery');
+    if (!gallery || galleryLoading || (!firstPage && !galleryCursor)) return;
+    
     const albumSelect = document.getElementById('galleryAlbumSelect');
     const albumId = albumSelect ? albumSelect.value : '';
     
-    const url = albumId ? `/albums/${albumId}/images` : '/images';
+    const params = new URLSearchParams({ limit: GALLERY_PAGE_SIZE, fields: GALLERY_FIELDS });
+    if (galleryCursor) params.set('after', galleryCursor);
+    const url = (albumId ? `/albums/${albumId}/images` : '/images') + '?' + params;
+    
+    const request = galleryRequest;
+    galleryLoading = true;
     
     fetch(url)
         .then(response => response.json())
-        .then(images => {
-            const gallery = document.getElementById('imageGallery');
-            if (!gallery) return;
-            
-            gallery.innerHTML = '';
+        .then(page => {
+            if (request !== galleryRequest) return;
+            galleryLoading = false;
+            galleryCursor = page.next_cursor;
             
-            if (images.length === 0) {
+            if (firstPage && page.images.length === 0) {
                 gallery.innerHTML = '<p style="text-align: center; color: #666; grid-column: 1 / -1;">No images found. Upload some images to get started!</p>';
                 return;
             }
             
-            images.forEach(image => {
-                const imageItem = document.createElement('div');
-                imageItem.className = 'image-item';
-                imageItem.dataset.imageId = image.id;
-                
-                // Determine correct image source URL
-                let imageSrc;
-                if (image.filepath.includes('uploads')) {
-                    imageSrc = `/uploads/${encodeURIComponent(image.filename)}`;
-                } else if (image.filepath.includes('pictures')) {
-                    imageSrc = `/pictures/${encodeURIComponent(image.filename)}`;
+            const sentinel = document.getElementById('gallerySentinel');
+            if (sentinel) {
+                if (galleryObserver) galleryObserver.unobserve(sentinel);
+                sentinel.remove();
+            }
+            
+            const fragment = document.createDocumentFragment();
+            page.images.forEach(image => fragment.appendChild(createGalleryItem(image)));
+            gallery.appendChild(fragment);
+            
+            // Watch the end of the gallery for the next page
+            if (galleryCursor) {
+                const newSentinel = document.createElement('div');
+                newSentinel.id = 'gallerySentinel';
+                newSentinel.style.gridColumn = '1 / -1';
+                if (galleryObserver) {
+                    gallery.appendChild(newSentinel);
+                    galleryObserver.observe(newSentinel);
                 } else {
-                    // Fallback: try to determine from filepath
-                    imageSrc = `/${image.filepath.replace(/\\/g, '/')}`;
+                    // No IntersectionObserver: fall back to a button
+                    newSentinel.innerHTML = '<button class="secondary">Load more</button>';
+                    newSentinel.querySelector('button').addEventListener('click', () => loadGalleryPage());
+                    gallery.appendChild(newSentinel);
                 }
-                
-                imageItem.innerHTML = `
-                    <div class="image-controls">
-                        <button class="success" onclick="displayImageById(${image.id})" title="Display">Display</button>
-                        <button class="secondary" onclick="showMoveImageModal(${image.id})" title="Move">Move</button>
-                        <button class="danger" onclick="showDeleteModal(${image.id})" title="Delete">Delete</button>
-                    </div>
-                    <img src="${imageSrc}" alt="${image.filename}" onerror="this.style.display='none'">
-                    <div class="image-info">
-                        <div class="image-filename">${image.original_filename}</div>
-                        ${image.album_name ? `<div class="image-album">${image.album_name}</div>` : ''}
-                        <div class="image-meta">
-                            <span>${image.file_size ? formatFileSize(image.file_size) : ''}</span>
-                            <span>${formatDate(image.created_at)}</span>
-                        </div>
-                    </div>
-                `;
-                
-                // Add click handler for display
-                imageItem.addEventListener('click', (e) => {
-                    if (!e.target.closest('.image-controls')) {
-                        displayImageById(image.id);
-                    }
-                });
-                
-                // Add right-click context menu
-                imageItem.addEventListener('contextmenu', (e) => {
-                    e.preventDefault();
-                    showContextMenu(e, image.id);
-                });
-                
-                gallery.appendChild(imageItem);
-            });
+            }
         })
         .catch(error => {
+            if (request !== galleryRequest) return;
+            galleryLoading = false;
             console.error('Error loading gallery:', error);
-            const gallery = document.getElementById('imageGallery');
-            if (gallery) {
+            if (firstPage) {
                 gallery.innerHTML = '<p style="text-align: center; color: #ff0000; grid-column: 1 / -1;">Error loading images</p>';
             }
         });
 }
 
+// Build the gallery tile for one image
+function createGalleryItem(image) {
+    const imageItem = document.createElement('div');
+    imageItem.className = 'image-item';
+    imageItem.dataset.imageId = image.id;
+    
+    // Server-side thumbnails instead of the full-resolution originals
+    const imageSrc = `/thumbs/${image.id}/320`;
+    const imageSrcset = `/thumbs/${image.id}/320 1x, /thumbs/${image.id}/640 2x`;
+    
+    imageItem.innerHTML = `
+        <div class="image-controls">
+            <button class="success" onclick="displayImageById(${image.id})" title="Display">Display</button>
+            <button class="secondary" onclick="showMoveImageModal(${image.id})" title="Move">Move</button>
+            <button class="danger" onclick="showDeleteModal(${image.id})" title="Delete">Delete</button>
+        </div>
+        <img src="${imageSrc}" srcset="${imageSrcset}" loading="lazy" alt="${image.filename}" onerror="this.style.display='none'">
+        <div class="image-info">
+            <div class="image-filename">${image.original_filename}</div>
+            ${image.album_name ? `<div class="image-album">${image.album_name}</div>` : ''}
+            <div class="image-meta">
+                <span>${image.file_size ? formatFileSize(image.file_size) : ''}</span>
+                <span>${formatDate(image.created_at)}</span>
+            </div>
+        </div>
+    `;
+    
+    // Add click handler for display
+    imageItem.addEventListener('click', (e) => {
+        if (!e.target.closest('.image-controls')) {
+            displayImageById(image.id);
+        }
+    });
+    
+    // Add right-click context menu
+    imageItem.addEventListener('contextmenu', (e) => {
+        e.preventDefault();
+        showContextMenu(e, image.id);
+    });
+    
+    return imageItem;
+}
+
 // Display an image by ID
 function displayImageById(imageId, saturation = null) {
     showStatus('Displaying image...', 'loading');
@@ -381,8 +513,9 @@ function displayImageById(imageId, saturation = null) {
     })
     .then(response => response.json())
     .then(data => {
-        if (data.message) {
-            showStatus(data.message, 'success');
+        if (data.job_id) {
+            showStatus('Refreshing display...', 'loading');
+            showDisplayJobResult(data.job_id, 'Image displayed');
         } else {
             showStatus(data.error, 'error');
         }
@@ -586,12 +719,13 @@ function setupEventListeners() {
                 const data = await response.json();
                 
                 if (response.ok) {
-                    showStatus(data.message, 'success');
+                    showStatus('Uploaded, refreshing display...', 'loading');
                     loadImageGallery();
                     updateStatusBar();
                     // Reset form
                     uploadForm.reset();
                     document.getElementById('preview').innerHTML = '';
+                    showDisplayJobResult(data.job_id, 'Image uploaded and displayed successfully!');
                 } else {
                     showStatus(data.error, 'error');
                 }
@@ -625,9 +759,10 @@ function setupEventListeners() {
                 const data = await response.json();
                 
                 if (response.ok) {
-                    showStatus(data.message, 'success');
+                    showStatus('Downloaded, refreshing display...', 'loading');
                     loadImageGallery();
                     updateStatusBar();
+                    showDisplayJobResult(data.job_id, 'Image downloaded and displayed successfully!');
                     // Show preview
                     const preview = document.getElementById('preview');
                     if (preview) {
@@ -644,6 +779,47 @@ function setupEventListeners() {
         });
     }
 
+    // Bulk import form
+    const importForm = document.getElementById('importForm');
+    if (importForm) {
+        importForm.addEventListener('submit', async function(e) {
+            e.preventDefault();
+            
+            const formData = new FormData(importForm);
+            showStatus('Uploading images...', 'loading');
+            
+            try {
+                const response = await fetch('/import', {
+                    method: 'POST',
+                    body: formData
+                });
+                const data = await response.json();
+                
+                if (!response.ok) {
+                    showStatus(data.error, 'error');
+                    return;
+                }
+                
+                importForm.reset();
+                showStatus(`Importing ${data.total} images...`, 'loading');
+                const job = await waitForDisplayJob(data.job_id, progress => {
+                    showStatus(`Importing images... ${progress.processed}/${progress.total}`, 'loading');
+                });
+                
+                if (job.status === 'done') {
+                    const progress = job.progress;
+                    showStatus(`Imported ${progress.imported} images (${progress.duplicates} duplicates, ${progress.failed} failed)`, 'success');
+                } else {
+                    showStatus(job.error || 'Import failed', 'error');
+                }
+                loadImageGallery();
+                loadAlbums();
+            } catch (error) {
+                showStatus('Import failed: ' + error.message, 'error');
+            }
+        });
+    }
+
     // Mode control buttons
     const startCycleBtn = document.getElementById('startCycleBtn');
     if (startCycleBtn) {
@@ -715,6 +891,27 @@ function setupEventListeners() {
         });
     }
 
+    // Cycle navigation buttons
+    ['previous', 'next', 'skip'].forEach(command => {
+        const button = document.getElementById(`${command}Btn`);
+        if (!button) return;
+        
+        button.addEventListener('click', async function() {
+            try {
+                const response = await fetch(`/${command}`, { method: 'POST' });
+                const data = await response.json();
+                
+                if (response.ok) {
+                    showStatus(data.message, 'success');
+                } else {
+                    showStatus(data.error, 'error');
+                }
+            } catch (error) {
+                showStatus(`Failed to send ${command}: ` + error.message, 'error');
+            }
+        });
+    });
+
     // Settings save button
     const saveSettingsBtn = document.getElementById('saveSettingsBtn');
     if (saveSettingsBtn) {
@@ -723,7 +920,9 @@ function setupEventListeners() {
                 cycle_time: parseInt(document.getElementById('cycleTime').value),
                 ai_generation_interval: parseInt(document.getElementById('aiInterval').value),
                 saturation: parseFloat(document.getElementById('globalSaturation').value),
-                current_album: parseInt(document.getElementById('cycleAlbumSelect').value)
+                current_album: parseInt(document.getElementById('cycleAlbumSelect').value),
+                cycle_order: document.getElementById('cycleOrder').value,
+                dither_preset: document.getElementById('ditherPreset').value
             };
             
             showStatus('Saving settings...', 'loading');
@@ -839,10 +1038,10 @@ function setupEventListeners() {
                 const data = await response.json();
                 
                 if (response.ok) {
-                    showStatus(data.message, 'success');
                     const preview = document.getElementById('preview');
                     if (preview) preview.innerHTML = '';
                     updateStatusBar();
+                    showDisplayJobResult(data.job_id, 'Display cleared successfully!');
                 } else {
                     showStatus(data.error, 'error');
                 }